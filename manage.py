@@ -5,7 +5,12 @@ import sys
 
 
 def main():
-    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+    # Тесты очищают кэш и загружают файлы: им нужны свои каталоги
+    # (yatube/test_settings.py), а не кэш и media разработчика.
+    settings = 'yatube.test_settings' if sys.argv[1:2] == ['test'] else (
+        'yatube.settings'
+    )
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings)
     try:
         from django.core.management import execute_from_command_line
     except ImportError as exc:
@@ -1,12 +1,51 @@
 from django.contrib import admin
+from django.db import connection
+from django.db.models import Q
 
+from . import search
 from .models import Follow, Comment, Post, Group
-
-
-class PostAdmin(admin.ModelAdmin):
-    list_display = ('pk', 'text', 'pub_date', 'author', 'group')
+from .pagination import CappedCountPaginator
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """Список без полного COUNT(*) и без выпадающих списков на всю таблицу.
+
+    Поле ``text`` ищется через FTS5-индекс вместо ``LIKE '%q%'``,
+    остальные поля поиска должны быть точными (``=``) и индексными.
+    """
+    paginator = CappedCountPaginator
+    show_full_result_count = False
+    search_scope = None
+
+    def get_search_results(self, request, queryset, search_term):
+        if connection.vendor != 'sqlite' or not search_term.strip():
+            return super().get_search_results(
+                request, queryset, search_term
+            )
+        condition = Q()
+        # Из одних знаков препинания FTS5-выражение не собрать: MATCH ''
+        # падает с синтаксической ошибкой.
+        if self.search_scope and search.match_expression(search_term):
+            condition |= Q(
+                pk__in=search.matching(search_term, self.search_scope)
+            )
+        for field in self.get_search_fields(request):
+            if field.startswith('='):
+                condition |= Q(**{field[1:]: search_term.strip()})
+        if not condition:
+            return queryset.none(), False
+        return queryset.filter(condition), False
+
+
+class PostAdmin(LargeTableAdmin):
+    list_display = ('pk', 'text', 'pub_date', 'author', 'group',
+                    'comment_count')
+    list_select_related = ('author', 'group')
     search_fields = ('text',)
-    list_filter = ('pub_date', 'group',)
+    search_scope = 'posts'
+    list_filter = ('pub_date', 'group')
+    date_hierarchy = 'pub_date'
+    autocomplete_fields = ('author', 'group')
     empty_value_display = '-пусто-'
 
 
@@ -24,17 +63,18 @@ class GroupAdmin(admin.ModelAdmin):
 admin.site.register(Group, GroupAdmin)
 
 
-class CommentAdmin(admin.ModelAdmin):
+class CommentAdmin(LargeTableAdmin):
     list_display = ('pk', 'text', 'author', 'post_id', 'created')
-    search_fields = ('text',
-                     'author__username',
-                     'author__first_name',
-                     'author__last_name')
-    list_filter = ('created', 'author',)
+    list_select_related = ('author',)
+    search_fields = ('text', '=author__username')
+    search_scope = 'comments'
+    date_hierarchy = 'created'
+    autocomplete_fields = ('author',)
+    raw_id_fields = ('post',)
     empty_value_display = '-пусто-'
 
     def post_id(self, obj):
-        return obj.post.id
+        return obj.post_id
 
     post_id.short_description = 'ID поста'
 
@@ -42,13 +82,12 @@ class CommentAdmin(admin.ModelAdmin):
 admin.site.register(Comment, CommentAdmin)
 
 
-class FollowAdmin(admin.ModelAdmin):
-    search_fields = ('author__username',
-                     'author__first_name',
-                     'author__last_name',
-                     'user__username',
-                     'user__first_name',
-                     'user__last_name')
+class FollowAdmin(LargeTableAdmin):
+    list_display = ('pk', 'user', 'author')
+    list_select_related = ('user', 'author')
+    search_fields = ('=author__username',
+                     '=user__username')
+    autocomplete_fields = ('user', 'author')
 
 
 admin.site.register(Follow, FollowAdmin)
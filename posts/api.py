@@ -0,0 +1,176 @@
+"""JSON API только для чтения: ленты и запись с комментариями.
+
+Страница ленты — это ``values()`` только по запрошенным в ``fields=``
+колонкам; строки сериализуются по одной прямо из итератора курсора
+БД в ``StreamingHttpResponse``. Пагинация — курсор ``cursor=`` на
+следующую (более старую) страницу.
+"""
+import json
+from functools import wraps
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+
+from . import timeline
+from .models import Comment, Group, Post, User
+from .pagination import CursorPaginator
+from .replicas import replica_reads
+
+PER_PAGE = 20
+MAX_PER_PAGE = 100
+POST_FIELDS = {
+    'id': 'pk',
+    'text': 'text',
+    'pub_date': 'pub_date',
+    'author': 'author__username',
+    'group': 'group__slug',
+    'image': 'image',
+    'comment_count': 'comment_count',
+}
+COMMENT_FIELDS = {
+    'id': 'pk',
+    'text': 'text',
+    'created': 'created',
+    'author': 'author__username',
+}
+IMAGE_STORAGE = Post._meta.get_field('image').storage
+
+
+class BadRequest(Exception):
+    pass
+
+
+def _dumps(value):
+    return json.dumps(value, cls=DjangoJSONEncoder, ensure_ascii=False)
+
+
+def _fields(request, param, available):
+    names = [name for name in request.GET.get(param, '').split(',') if name]
+    unknown = set(names) - set(available)
+    if unknown:
+        raise BadRequest(
+            f'Неизвестные поля в {param}: {", ".join(sorted(unknown))}'
+        )
+    return names or list(available)
+
+
+def _per_page(request):
+    try:
+        per_page = int(request.GET.get('per_page', PER_PAGE))
+    except ValueError:
+        raise BadRequest('per_page должен быть числом')
+    return max(1, min(per_page, MAX_PER_PAGE))
+
+
+def _serialize(row, fields, available):
+    item = {name: row[available[name]] for name in fields}
+    if 'image' in item:
+        item['image'] = (IMAGE_STORAGE.url(item['image'])
+                         if item['image'] else None)
+    return item
+
+
+def _stream(request, queryset, available, field='pub_date', prefix='',
+            fields_param='fields', paginator=None):
+    """Страница ``queryset`` старше ``cursor=`` потоком JSON.
+
+    ``{prefix "results": [...], "next": курсор}``: курсор известен лишь
+    после последней строки, поэтому он идёт в конце документа.
+    ``paginator(queryset, per_page)`` заменяет CursorPaginator по
+    ``field``, например для ленты подписок.
+    """
+    fields = _fields(request, fields_param, available)
+    per_page = _per_page(request)
+    if paginator is None:
+        paginator = CursorPaginator(queryset, per_page, field=field)
+    else:
+        paginator = paginator(queryset, per_page)
+    cursor = request.GET.get('cursor')
+    position = paginator.decode(cursor) if cursor else None
+    if cursor and position is None:
+        raise BadRequest('Неверный курсор')
+    lookups = {available[name] for name in fields} | {'pk', field}
+    rows = paginator.older_than(position).values(*lookups)
+    # База выбирается сейчас: тело ответа читается уже после выхода
+    # из представления и из replica_reads.
+    rows = rows.using(rows.db)[:per_page + 1]
+
+    def chunks():
+        yield '{' + prefix + '"results": ['
+        next_cursor = None
+        last = None
+        for index, row in enumerate(rows.iterator()):
+            if index == per_page:
+                next_cursor = paginator.encode_position(
+                    last[field], last['pk']
+                )
+                break
+            yield (', ' if index else '') + _dumps(
+                _serialize(row, fields, available)
+            )
+            last = row
+        yield '], "next": ' + _dumps(next_cursor) + '}'
+
+    return StreamingHttpResponse(chunks(), content_type='application/json')
+
+
+def api_view(view):
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        try:
+            return view(request, *args, **kwargs)
+        except BadRequest as error:
+            return JsonResponse({'error': str(error)}, status=400)
+    return replica_reads(wrapper)
+
+
+@api_view
+def feed(request):
+    return _stream(request, Post.objects.all(), POST_FIELDS)
+
+
+@api_view
+def group_feed(request, slug):
+    group = get_object_or_404(Group, slug=slug)
+    return _stream(request, group.posts.all(), POST_FIELDS)
+
+
+@api_view
+def author_feed(request, username):
+    author = get_object_or_404(User, username=username)
+    return _stream(request, author.posts.all(), POST_FIELDS)
+
+
+@api_view
+def follow_feed(request):
+    if not request.user.is_authenticated:
+        return JsonResponse({'error': 'Нужна авторизация'}, status=401)
+    return _stream(
+        request,
+        Post.objects.all(),
+        POST_FIELDS,
+        paginator=lambda posts, per_page: timeline.cursors(
+            posts, request.user, per_page
+        )
+    )
+
+
+@api_view
+def post_detail(request, post_id):
+    """Запись и страница её комментариев (``comment_fields=``)."""
+    fields = _fields(request, 'fields', POST_FIELDS)
+    post = get_object_or_404(
+        Post.objects.values(*{POST_FIELDS[name] for name in fields}),
+        pk=post_id
+    )
+    return _stream(
+        request,
+        Comment.objects.filter(post_id=post_id),
+        COMMENT_FIELDS,
+        field='created',
+        prefix='"post": {}, '.format(
+            _dumps(_serialize(post, fields, POST_FIELDS))
+        ),
+        fields_param='comment_fields'
+    )
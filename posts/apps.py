@@ -1,5 +1,13 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class PostsConfig(AppConfig):
     name = 'posts'
+
+    def ready(self):
+        from . import signals
+        # Общий кэш переживает перезапуск: после миграций фрагменты,
+        # собранные по старой схеме и данным, устаревают сменой эпохи.
+        # Очищать кэш нельзя: им пользуются и другие процессы.
+        post_migrate.connect(signals.expire_cache, sender=self)
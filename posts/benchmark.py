@@ -0,0 +1,109 @@
+"""Замер задержек основных страниц через тестовый клиент Django.
+
+Для каждой страницы берётся самый тяжёлый на текущих данных пример:
+самое наполненное сообщество, самый плодовитый автор, запись с
+самым длинным обсуждением, пользователь с наибольшим числом
+подписок. Для каждого запроса считаются время, число SQL-запросов
+(по основной базе и репликам) и размер ответа.
+"""
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from . import feed_cache
+from .models import Follow, Group, Post, User
+
+VIEWS = ('index', 'group_posts', 'profile', 'post_view', 'follow_index')
+PERCENTILES = (50, 95, 99)
+
+
+def percentile(values, rank):
+    """Перцентиль по ближайшему рангу; ``values`` отсортированы."""
+    index = max(0, -(-rank * len(values) // 100) - 1)
+    return values[index]
+
+
+def targets():
+    """``{view: (url, пользователь или None)}`` для непустых страниц."""
+    found = {'index': (reverse('index'), None)}
+    group = Group.objects.annotate(
+        total=Count('posts')
+    ).order_by('-total').first()
+    if group is not None:
+        found['group_posts'] = (
+            reverse('group_posts', args=[group.slug]), None
+        )
+    author = User.objects.annotate(
+        total=Count('posts')
+    ).order_by('-total').first()
+    if author is not None:
+        found['profile'] = (reverse('profile', args=[author.username]), None)
+    post = Post.objects.select_related('author').order_by(
+        '-comment_count', '-pk'
+    ).first()
+    if post is not None:
+        found['post_view'] = (
+            reverse('post', args=[post.author.username, post.pk]), None
+        )
+    follower = Follow.objects.values('user').annotate(
+        total=Count('pk')
+    ).order_by('-total').first()
+    if follower is not None:
+        found['follow_index'] = (
+            reverse('follow_index'), User.objects.get(pk=follower['user'])
+        )
+    return found
+
+
+def _measure(client, url, cold):
+    if cold:
+        feed_cache.bump_epoch()
+    with ExitStack() as stack:
+        captured = [
+            stack.enter_context(CaptureQueriesContext(connections[alias]))
+            for alias in [DEFAULT_DB_ALIAS, *settings.REPLICA_DATABASES]
+        ]
+        started = time.perf_counter()
+        response = client.get(url)
+        body = (b''.join(response.streaming_content)
+                if response.streaming else response.content)
+        elapsed = time.perf_counter() - started
+    return (response.status_code, elapsed,
+            sum(len(queries) for queries in captured), len(body))
+
+
+def run(views=VIEWS, requests=50, warmup=5, cold=False):
+    """Отчёт ``{view: {...}}``; времена в миллисекундах.
+
+    ``cold`` перед каждым запросом меняет эпоху кэша: так меряется
+    построение страницы, а не отдача готовых фрагментов, а сам общий
+    кэш не очищается.
+    """
+    report = {}
+    for view, (url, user) in targets().items():
+        if view not in views:
+            continue
+        client = Client(HTTP_HOST=settings.ALLOWED_HOSTS[0])
+        if user is not None:
+            client.force_login(user)
+        for _ in range(warmup):
+            _measure(client, url, cold)
+        samples = [_measure(client, url, cold) for _ in range(requests)]
+        timings = sorted(elapsed * 1000 for _, elapsed, _, _ in samples)
+        report[view] = {
+            'url': url,
+            'requests': requests,
+            'statuses': sorted({status for status, _, _, _ in samples}),
+            **{f'p{rank}_ms': round(percentile(timings, rank), 3)
+               for rank in PERCENTILES},
+            'mean_ms': round(sum(timings) / len(timings), 3),
+            'queries': max(queries for _, _, queries, _ in samples),
+            'bytes': max(size for _, _, _, size in samples),
+        }
+    return report
@@ -0,0 +1,105 @@
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.utils import timezone
+from sorl.thumbnail import delete as delete_thumbnails
+
+from . import thumbnails, webp
+from .models import ImageBlob, Post
+
+BATCH_SIZE = 500
+# Файл сохраняется раньше, чем на него появляется ссылка, поэтому
+# свежие «сироты» не трогаем.
+GRACE_PERIOD = timedelta(hours=1)
+
+
+def add_reference(name):
+    add_references([name])
+
+
+def add_references(names):
+    """Ссылки на несколько файлов: по запросу на пачку, а не на имя."""
+    counts = Counter(names)
+    by_count = defaultdict(list)
+    for name, count in counts.items():
+        by_count[count].append(name)
+    names = list(counts)
+    for start in range(0, len(names), BATCH_SIZE):
+        ImageBlob.objects.bulk_create(
+            [ImageBlob(name=name) for name in names[start:start + BATCH_SIZE]],
+            ignore_conflicts=True
+        )
+    now = timezone.now()
+    for count, names in by_count.items():
+        for start in range(0, len(names), BATCH_SIZE):
+            ImageBlob.objects.filter(
+                name__in=names[start:start + BATCH_SIZE]
+            ).update(ref_count=F('ref_count') + count, updated=now)
+
+
+def drop_reference(name):
+    ImageBlob.objects.filter(name=name).update(
+        ref_count=Greatest(F('ref_count') - 1, 0),
+        updated=timezone.now()
+    )
+
+
+def _fresh(storage, name, cutoff):
+    """Файл записан после ``cutoff``: его, возможно, загружают заново."""
+    try:
+        return storage.get_modified_time(name) >= cutoff
+    except FileNotFoundError:
+        return False
+
+
+def collect(grace_period=GRACE_PERIOD):
+    """Удаляет пачками файлы, на которые больше не ссылается ни одна запись.
+
+    Вместе с файлом удаляются его миниатюры и WebP-варианты. Строки
+    удаляются, а файлы проверяются и удаляются в одной транзакции: пока
+    она идёт, новые ссылки ждут блокировку базы. Повторная загрузка
+    того же содержимого обновляет время файла (см. ``storage``), поэтому
+    файл моложе ``grace_period`` остаётся, а его строка возвращается
+    для следующего прохода.
+    """
+    storage = Post._meta.get_field('image').storage
+    cutoff = timezone.now() - grace_period
+    orphans = ImageBlob.objects.filter(
+        ref_count=0,
+        updated__lt=cutoff
+    ).values_list('pk', 'name')
+    collected = 0
+    while True:
+        batch = dict(orphans[:BATCH_SIZE])
+        if not batch:
+            return collected
+        with transaction.atomic():
+            # Сначала забираем строки: то, на что успели сослаться,
+            # остаётся, а новых ссылок до конца транзакции не будет.
+            ImageBlob.objects.filter(pk__in=list(batch), ref_count=0).delete()
+            for pk in ImageBlob.objects.filter(
+                pk__in=list(batch)
+            ).values_list('pk', flat=True):
+                del batch[pk]
+            names = set(batch.values())
+            fresh = {name for name in names
+                     if _fresh(storage, name, cutoff)}
+            ImageBlob.objects.bulk_create(
+                [ImageBlob(name=name) for name in fresh],
+                ignore_conflicts=True
+            )
+            for name in names - fresh:
+                delete_thumbnails(thumbnails.source_file(name),
+                                  delete_file=False)
+                for variant in (webp.CARD, webp.FULL):
+                    default_storage.delete(webp.variant_name(name, variant))
+                cache.delete_many(
+                    [thumbnails.url_key(name), thumbnails.webp_key(name)]
+                )
+                storage.delete(name)
+        collected += len(names - fresh)
@@ -0,0 +1,394 @@
+"""Двухуровневый кэш: LRU в памяти процесса перед общим файлом SQLite.
+
+Общий уровень — файл SQLite, который видят все процессы на машине.
+Каждое изменение в нём пишется и в журнал событий; процесс читает журнал
+не чаще раза в ``POLL_INTERVAL`` секунд и выбрасывает из своего LRU
+изменённые другими ключи. Процесс, который долго не заглядывал в журнал
+(его хвост мог быть уже обрезан), сбрасывает свой LRU целиком.
+"""
+import os
+import pickle
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS cache_entries (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    expires REAL
+);
+CREATE INDEX IF NOT EXISTS cache_entries_expires ON cache_entries (expires);
+CREATE TABLE IF NOT EXISTS cache_events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    key TEXT,
+    origin TEXT NOT NULL,
+    created REAL NOT NULL
+);
+'''
+# Сколько хранится журнал событий и раз в сколько записей чистится файл
+EVENT_RETENTION = 60
+CULL_EVERY = 100
+# Предел числа параметров одного запроса SQLite
+CHUNK_SIZE = 500
+
+_states = {}
+_states_lock = threading.Lock()
+
+
+class LocalTier:
+    """LRU, ограниченный числом записей и суммарным размером значений."""
+
+    def __init__(self, max_entries, max_bytes, timeout):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self._data = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires, value = item
+            if expires <= time.time():
+                self._pop(key)
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, expires):
+        local_expires = time.time() + self.timeout
+        if expires is not None:
+            local_expires = min(local_expires, expires)
+        with self._lock:
+            self._pop(key)
+            if len(value) > self.max_bytes:
+                return
+            self._data[key] = (local_expires, value)
+            self._size += len(value)
+            while (len(self._data) > self.max_entries
+                   or self._size > self.max_bytes):
+                _, (_, evicted) = self._data.popitem(last=False)
+                self._size -= len(evicted)
+
+    def delete(self, key):
+        with self._lock:
+            self._pop(key)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._size = 0
+
+    def _pop(self, key):
+        item = self._data.pop(key, None)
+        if item is not None:
+            self._size -= len(item[1])
+
+    def __len__(self):
+        return len(self._data)
+
+
+class ProcessState:
+    """Всё, что один процесс держит для одного файла кэша."""
+
+    def __init__(self, options):
+        self.pid = os.getpid()
+        self.origin = f'{self.pid}:{uuid.uuid4().hex}'
+        self.local = LocalTier(
+            options.get('LOCAL_MAX_ENTRIES', 1000),
+            options.get('LOCAL_MAX_BYTES', 16 * 1024 * 1024),
+            options.get('LOCAL_TIMEOUT', 60),
+        )
+        self.connections = threading.local()
+        self.lock = threading.Lock()
+        self.last_event = None
+        self.last_poll = 0
+        self.writes = 0
+        self.counters = {
+            tier: {'hits': 0, 'misses': 0} for tier in ('local', 'shared')
+        }
+
+    def count(self, tier, outcome, number=1):
+        with self.lock:
+            self.counters[tier][outcome] += number
+
+
+class TwoTierCache(BaseCache):
+    pickle_protocol = pickle.HIGHEST_PROTOCOL
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        self._location = location
+        self._options = params.get('OPTIONS', {})
+        self._poll_interval = self._options.get('POLL_INTERVAL', 1)
+
+    @property
+    def _state(self):
+        # После fork у процесса свой LRU и свой идентификатор в журнале.
+        state = _states.get(self._location)
+        if state is None or state.pid != os.getpid():
+            with _states_lock:
+                state = _states.get(self._location)
+                if state is None or state.pid != os.getpid():
+                    state = _states[self._location] = ProcessState(
+                        self._options
+                    )
+        return state
+
+    def _connection(self):
+        connections = self._state.connections
+        connection = getattr(connections, 'connection', None)
+        if connection is None:
+            directory = os.path.dirname(self._location)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(
+                self._location, timeout=5, isolation_level=None
+            )
+            connection.execute('PRAGMA journal_mode = wal')
+            connection.execute('PRAGMA synchronous = normal')
+            connection.executescript(SCHEMA)
+            connections.connection = connection
+        return connection
+
+    @contextmanager
+    def _transaction(self):
+        self._poll()
+        connection = self._connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            yield connection
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('COMMIT')
+
+    def _record(self, connection, keys):
+        state = self._state
+        now = time.time()
+        connection.executemany(
+            'INSERT INTO cache_events (key, origin, created) '
+            'VALUES (?, ?, ?)',
+            [(key, state.origin, now) for key in keys]
+        )
+
+    def _poll(self):
+        state = self._state
+        now = time.time()
+        if now - state.last_poll < self._poll_interval:
+            return
+        connection = self._connection()
+        with state.lock:
+            if (state.last_event is None
+                    or now - state.last_poll > EVENT_RETENTION):
+                state.local.clear()
+                state.last_event = connection.execute(
+                    'SELECT COALESCE(MAX(id), 0) FROM cache_events'
+                ).fetchone()[0]
+            else:
+                events = connection.execute(
+                    'SELECT id, key, origin FROM cache_events '
+                    'WHERE id > ? ORDER BY id',
+                    (state.last_event,)
+                ).fetchall()
+                for event_id, key, origin in events:
+                    state.last_event = event_id
+                    if origin == state.origin:
+                        continue
+                    if key is None:
+                        state.local.clear()
+                    else:
+                        state.local.delete(key)
+            state.last_poll = now
+
+    def _cull(self, connection):
+        state = self._state
+        with state.lock:
+            state.writes += 1
+            if state.writes % CULL_EVERY:
+                return
+        now = time.time()
+        connection.execute(
+            'DELETE FROM cache_entries WHERE expires <= ?', (now,)
+        )
+        connection.execute(
+            'DELETE FROM cache_events WHERE created < ?',
+            (now - EVENT_RETENTION,)
+        )
+        count = connection.execute(
+            'SELECT COUNT(*) FROM cache_entries'
+        ).fetchone()[0]
+        if count > self._max_entries:
+            connection.execute(
+                'DELETE FROM cache_entries WHERE key IN ('
+                'SELECT key FROM cache_entries '
+                'ORDER BY expires IS NULL, expires LIMIT ?)',
+                (count // self._cull_frequency,)
+            )
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def get(self, key, default=None, version=None):
+        key = self._key(key, version)
+        found = self._get_many([key])
+        return pickle.loads(found[key]) if key in found else default
+
+    def get_many(self, keys, version=None):
+        made = {self._key(key, version): key for key in keys}
+        found = self._get_many(list(made))
+        return {
+            made[key]: pickle.loads(value) for key, value in found.items()
+        }
+
+    def _get_many(self, keys):
+        self._poll()
+        state = self._state
+        found = {}
+        for key in keys:
+            value = state.local.get(key)
+            if value is not None:
+                found[key] = value
+        missing = [key for key in keys if key not in found]
+        state.count('local', 'hits', len(found))
+        state.count('local', 'misses', len(missing))
+        if not missing:
+            return found
+        connection = self._connection()
+        now = time.time()
+        shared = 0
+        for start in range(0, len(missing), CHUNK_SIZE):
+            chunk = missing[start:start + CHUNK_SIZE]
+            rows = connection.execute(
+                'SELECT key, value, expires FROM cache_entries '
+                'WHERE key IN ({})'.format(', '.join('?' * len(chunk))),
+                chunk
+            ).fetchall()
+            for key, value, expires in rows:
+                if expires is not None and expires <= now:
+                    continue
+                found[key] = value
+                state.local.set(key, value, expires)
+                shared += 1
+        state.count('shared', 'hits', shared)
+        state.count('shared', 'misses', len(missing) - shared)
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.set_many({key: value}, timeout, version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        expires = self.get_backend_timeout(timeout)
+        rows = [
+            (self._key(key, version),
+             pickle.dumps(value, self.pickle_protocol),
+             expires)
+            for key, value in data.items()
+        ]
+        if not rows:
+            return []
+        with self._transaction() as connection:
+            connection.executemany(
+                'INSERT OR REPLACE INTO cache_entries (key, value, expires) '
+                'VALUES (?, ?, ?)',
+                rows
+            )
+            self._record(connection, [key for key, _, _ in rows])
+            self._cull(connection)
+        for key, value, _ in rows:
+            self._state.local.set(key, value, expires)
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        value = pickle.dumps(value, self.pickle_protocol)
+        expires = self.get_backend_timeout(timeout)
+        with self._transaction() as connection:
+            connection.execute(
+                'DELETE FROM cache_entries WHERE key = ? AND expires <= ?',
+                (key, time.time())
+            )
+            added = connection.execute(
+                'INSERT OR IGNORE INTO cache_entries (key, value, expires) '
+                'VALUES (?, ?, ?)',
+                (key, value, expires)
+            ).rowcount == 1
+            if added:
+                self._record(connection, [key])
+        if added:
+            self._state.local.set(key, value, expires)
+        return added
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        with self._transaction() as connection:
+            touched = connection.execute(
+                'UPDATE cache_entries SET expires = ? WHERE key = ? '
+                'AND (expires IS NULL OR expires > ?)',
+                (self.get_backend_timeout(timeout), key, time.time())
+            ).rowcount == 1
+            if touched:
+                self._record(connection, [key])
+        self._state.local.delete(key)
+        return touched
+
+    def incr(self, key, delta=1, version=None):
+        key = self._key(key, version)
+        with self._transaction() as connection:
+            row = connection.execute(
+                'SELECT value, expires FROM cache_entries WHERE key = ?',
+                (key,)
+            ).fetchone()
+            if row is None or (row[1] is not None and row[1] <= time.time()):
+                raise ValueError("Key '%s' not found" % key)
+            new_value = pickle.loads(row[0]) + delta
+            value = pickle.dumps(new_value, self.pickle_protocol)
+            connection.execute(
+                'UPDATE cache_entries SET value = ? WHERE key = ?',
+                (value, key)
+            )
+            self._record(connection, [key])
+        self._state.local.set(key, value, row[1])
+        return new_value
+
+    def delete(self, key, version=None):
+        self.delete_many([key], version)
+
+    def delete_many(self, keys, version=None):
+        keys = [self._key(key, version) for key in keys]
+        if not keys:
+            return
+        with self._transaction() as connection:
+            connection.executemany(
+                'DELETE FROM cache_entries WHERE key = ?',
+                [(key,) for key in keys]
+            )
+            self._record(connection, keys)
+        for key in keys:
+            self._state.local.delete(key)
+
+    def clear(self):
+        with self._transaction() as connection:
+            connection.execute('DELETE FROM cache_entries')
+            self._record(connection, [None])
+        self._state.local.clear()
+
+    def stats(self):
+        """Попадания и промахи по уровням с начала работы процесса."""
+        state = self._state
+        with state.lock:
+            return {
+                tier: dict(counters)
+                for tier, counters in state.counters.items()
+            }
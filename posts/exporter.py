@@ -0,0 +1,126 @@
+"""Потоковая выгрузка записей автора или сообщества с обсуждениями.
+
+Комментарии в выгрузке — это комментарии к выгружаемым записям, кто бы
+их ни написал, а не комментарии автора под чужими записями: так каждая
+строка комментария ссылается на запись из той же выгрузки и
+``import_content`` принимает её целиком.
+
+Строки читаются итераторами ``values()`` порциями по ``CHUNK_SIZE`` и
+сразу превращаются в байты, поэтому память не зависит от объёма
+истории. Формат строк совпадает с тем, что принимает
+``import_content``: JSONL загружается двумя командами,
+``import_content posts`` и затем ``import_content comments`` на тот же
+файл (каждая берёт строки своего ``type``), файлы из ZIP — каждый
+своей.
+"""
+import json
+import zipfile
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import Comment, Post
+
+CHUNK_SIZE = 2000
+# Сколько байт архива копится перед отдачей клиенту
+ZIP_FLUSH_SIZE = 256 * 1024
+IMAGE_STORAGE = Post._meta.get_field('image').storage
+
+
+def post_records(scope):
+    """Записи, отобранные ``scope`` (например ``{'author': user}``)."""
+    rows = Post.objects.filter(**scope).order_by('pub_date', 'id').values_list(
+        'id', 'text', 'pub_date', 'updated', 'author__username',
+        'group__slug', 'image'
+    )
+    for pk, text, pub_date, updated, author, group, image in rows.iterator(
+        chunk_size=CHUNK_SIZE
+    ):
+        yield {
+            'id': pk,
+            'text': text,
+            'pub_date': pub_date,
+            'updated': updated,
+            'author': author,
+            'group': group,
+            'image': image or None,
+            'image_url': IMAGE_STORAGE.url(image) if image else None,
+        }
+
+
+def comment_records(scope):
+    """Комментарии в том же порядке записей, что и ``post_records``.
+
+    Фильтр — соединение, а не ``post__in``: тогда SQLite идёт по индексу
+    записей и для каждой берёт комментарии по (post, created, id) без
+    сортировки всей выборки.
+    """
+    rows = Comment.objects.filter(**{
+        f'post__{lookup}': value for lookup, value in scope.items()
+    }).order_by(
+        'post__pub_date', 'post_id', 'created', 'id'
+    ).values_list('post_id', 'author__username', 'text', 'created')
+    for post, author, text, created in rows.iterator(chunk_size=CHUNK_SIZE):
+        yield {
+            'post': post,
+            'author': author,
+            'text': text,
+            'created': created,
+        }
+
+
+def _line(record):
+    return json.dumps(record, cls=DjangoJSONEncoder,
+                      ensure_ascii=False) + '\n'
+
+
+def jsonl(scope):
+    """Каждая запись, а сразу за ней её комментарии; поле ``type``."""
+    comments = comment_records(scope)
+    pending = next(comments, None)
+    for post in post_records(scope):
+        yield _line({'type': 'post', **post}).encode()
+        while pending is not None and pending['post'] == post['id']:
+            yield _line({'type': 'comment', **pending}).encode()
+            pending = next(comments, None)
+
+
+class _Buffer:
+    """Файл только на запись: zipfile пишет сюда, генератор забирает."""
+
+    def __init__(self):
+        self.chunks = []
+        self.size = 0
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.size += len(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def take(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        self.size = 0
+        return data
+
+
+def zip_archive(scope):
+    """ZIP с posts.jsonl и comments.jsonl, отдаваемый по мере сжатия."""
+    buffer = _Buffer()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for name, records in (('posts.jsonl', post_records(scope)),
+                              ('comments.jsonl', comment_records(scope))):
+            with archive.open(name, 'w', force_zip64=True) as member:
+                for record in records:
+                    member.write(_line(record).encode())
+                    if buffer.size >= ZIP_FLUSH_SIZE:
+                        yield buffer.take()
+    yield buffer.take()
+
+
+FORMATS = {
+    'jsonl': (jsonl, 'application/x-ndjson', 'jsonl'),
+    'zip': (zip_archive, 'application/zip', 'zip'),
+}
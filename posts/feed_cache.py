@@ -0,0 +1,162 @@
+import hashlib
+import time
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.core.cache import cache
+
+GLOBAL = 'global'
+# Эпоха всего кэша страниц: меняется после миграций и входит в версии
+# лент и ключи карточек, поэтому общий кэш не приходится очищать.
+EPOCH_KEY = 'cache-epoch'
+
+
+def _key(scope):
+    return f'feed-generation:{scope}'
+
+
+def _changed_key(scope):
+    return f'feed-changed:{scope}'
+
+
+def group_scope(group_id):
+    return f'group:{group_id}'
+
+
+def author_scope(author_id):
+    return f'author:{author_id}'
+
+
+def author_card_scope(author_id):
+    return f'author-card:{author_id}'
+
+
+def group_card_scope(group_id):
+    return f'group-card:{group_id}'
+
+
+def card_scopes(post):
+    """Версии подписей карточки: имя автора, название сообщества.
+
+    Отдельно от лент автора и сообщества: новые записи меняют ленты,
+    но не подписи, и готовые карточки остаются в кэше.
+    """
+    scopes = [author_card_scope(post.author_id)]
+    if post.group_id is not None:
+        scopes.append(group_card_scope(post.group_id))
+    return scopes
+
+
+def post_scopes(post, group_id=None):
+    scopes = {GLOBAL, author_scope(post.author_id)}
+    for pk in (post.group_id, group_id):
+        if pk is not None:
+            scopes.add(group_scope(pk))
+    return scopes
+
+
+def _initial():
+    # Вытесненный счётчик не должен начать заново с уже выданных значений.
+    return int(time.time() * 1000)
+
+
+def bump_epoch():
+    """Разом устаревают все фрагменты лент и карточки записей."""
+    try:
+        cache.incr(EPOCH_KEY)
+    except ValueError:
+        cache.add(EPOCH_KEY, _initial(), timeout=None)
+
+
+def _versions(keys):
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, _initial(), timeout=None)
+            versions[key] = cache.get(key)
+    return versions
+
+
+def generation(*scopes):
+    """Версия ленты: меняется, как только меняется её содержимое."""
+    keys = [EPOCH_KEY] + [_key(scope) for scope in scopes]
+    versions = _versions(keys)
+    return '.'.join(str(versions[key]) for key in keys)
+
+
+def card_versions(posts):
+    """Эпоха и версии подписей карточек ``posts`` одним ``get_many``."""
+    scopes = {scope for post in posts for scope in card_scopes(post)}
+    versions = _versions([EPOCH_KEY] + [_key(scope) for scope in scopes])
+    return {
+        EPOCH_KEY: versions[EPOCH_KEY],
+        **{scope: versions[_key(scope)] for scope in scopes},
+    }
+
+
+def bump(scopes):
+    for scope in scopes:
+        key = _key(scope)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, _initial(), timeout=None)
+    cache.set_many(
+        {_changed_key(scope): time.time() for scope in scopes},
+        timeout=None
+    )
+
+
+def last_changed(*scopes):
+    """Когда последний раз менялась любая из лент; None — неизвестно."""
+    stamps = cache.get_many([_changed_key(scope) for scope in scopes])
+    if len(stamps) < len(scopes):
+        return None
+    return datetime.fromtimestamp(int(max(stamps.values())), timezone.utc)
+
+
+def etag(request, *scopes):
+    """Валидатор страницы: версия лент, зритель и адрес с параметрами."""
+    raw = (f'{generation(*scopes)}|{request.user.pk}|'
+           f'{request.get_full_path()}')
+    return hashlib.md5(raw.encode()).hexdigest()
+
+
+def context(*scopes):
+    """Переменные для ``{% cache %}`` вокруг ленты."""
+    return {
+        'feed_version': generation(*scopes),
+        'feed_cache_timeout': settings.FEED_CACHE_TIMEOUT,
+    }
+
+
+def viewer(user, author_ids):
+    """Что видит зритель в карточках: ``anon``, ``user`` или ``owner``.
+
+    Владельца отличает кнопка «Редактировать» на его записях; если среди
+    ``author_ids`` есть и другие авторы, в вид входит его id.
+    """
+    if user is None or not user.is_authenticated:
+        return 'anon'
+    if user.pk not in author_ids:
+        return 'user'
+    return 'owner' if len(author_ids) == 1 else f'owner:{user.pk}'
+
+
+def fragment(user, page, author_ids=None, before=None, after=None):
+    """Ключ ``{% cache %}`` страницы ленты: её номер или курсор и зритель.
+
+    Прочие параметры адреса в ключ не входят. ``author_ids`` — авторы
+    ленты; если не заданы, берутся из записей страницы, но только для
+    вошедшего пользователя: гостю записи для ключа не нужны.
+    """
+    if before or after:
+        position = f'before={before or ""}&after={after or ""}'
+    else:
+        position = f'page={page.number}'
+    if author_ids is None and user.is_authenticated:
+        author_ids = {post.author_id for post in page}
+    return {
+        'feed_page': position,
+        'feed_viewer': viewer(user, author_ids or ()),
+    }
@@ -12,6 +12,20 @@ class PostForm(ModelForm):
             'group': 'Группа'
         }
 
+    def save(self, commit=True):
+        """Правка пишет только поля формы и отметку ``updated``.
+
+        Иначе ``comment_count``, прочитанный до правки, затёр бы
+        комментарии, добавленные за это время.
+        """
+        if commit and self.instance.pk is not None:
+            post = super().save(commit=False)
+            post.save(update_fields=[*self._meta.fields, 'updated'])
+            self.save_m2m()
+        else:
+            post = super().save(commit)
+        return post
+
 
 class CommentForm(ModelForm):
     class Meta:
@@ -0,0 +1,257 @@
+"""Потоковый импорт пользователей, сообществ, записей, комментариев и подписок.
+
+Файл JSONL или CSV читается построчно; строки копятся в пачки для
+``bulk_create``, а пачки фиксируются транзакциями по ``chunk_size``
+строк. Ссылки на пользователей и сообщества разрешаются по словарям
+``username -> id`` и ``slug -> id``, загруженным один раз. Сигналы при
+``bulk_create`` не срабатывают, поэтому производные данные (ленты,
+счётчики, версии кэша) пересчитываются в конце.
+
+Строки с полем ``type`` другого вида пропускаются молча: JSONL из
+``export_content``, где записи и комментарии идут вперемешку,
+загружается в два прохода — сначала ``posts``, потом ``comments``.
+"""
+import csv
+import json
+import time
+from contextlib import contextmanager
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.db import connections, router, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import blobs, feed_cache, stats, thumbnails, timeline
+from .models import Comment, Follow, Group, Post, User
+
+BATCH_SIZE = 2000
+CHUNK_SIZE = 50000
+# Сколько id передаётся в одном IN (...)
+ID_CHUNK = 500
+MODELS = {
+    'users': User,
+    'groups': Group,
+    'posts': Post,
+    'comments': Comment,
+    'follows': Follow,
+}
+# Повторный импорт этих строк не ошибка: уже существующие пропускаются
+IGNORE_CONFLICTS = ('users', 'groups', 'follows')
+# Значение поля ``type`` строк каждого вида в выгрузке (exporter.jsonl)
+ROW_TYPES = {'posts': 'post', 'comments': 'comment'}
+
+
+def read_rows(stream, fmt):
+    if fmt == 'csv':
+        yield from csv.DictReader(stream)
+        return
+    for line in stream:
+        line = line.strip()
+        if line:
+            yield json.loads(line)
+
+
+@contextmanager
+def preserved_dates(model):
+    """Отключает auto_now/auto_now_add: даты берутся из файла."""
+    fields = [
+        field for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now', False)
+        or getattr(field, 'auto_now_add', False)
+    ]
+    saved = [(field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, (auto_now, auto_now_add) in zip(fields, saved):
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def _date(value):
+    return parse_datetime(value) if value else None
+
+
+class Importer:
+    def __init__(self, kind, batch_size=BATCH_SIZE, chunk_size=CHUNK_SIZE,
+                 report=None):
+        self.kind = kind
+        self.batch_size = batch_size
+        self.chunk_size = chunk_size
+        self.report = report or (lambda imported, skipped, rate: None)
+        self.imported = 0
+        self.skipped = 0
+        self.authors = set()
+        self.groups = set()
+        self.followers = set()
+        self.posts = set()
+        self._users = None
+        self._group_ids = None
+
+    @property
+    def users(self):
+        if self._users is None:
+            self._users = dict(User.objects.values_list('username', 'id'))
+        return self._users
+
+    @property
+    def group_ids(self):
+        if self._group_ids is None:
+            self._group_ids = dict(Group.objects.values_list('slug', 'id'))
+        return self._group_ids
+
+    def build_users(self, row):
+        return User(
+            username=row['username'],
+            first_name=row.get('first_name') or '',
+            last_name=row.get('last_name') or '',
+            email=row.get('email') or '',
+            password=make_password(None),
+        )
+
+    def build_groups(self, row):
+        return Group(
+            slug=row['slug'],
+            title=row['title'],
+            description=row.get('description') or '',
+        )
+
+    def build_posts(self, row):
+        author_id = self.users.get(row['author'])
+        group_id = None
+        if row.get('group'):
+            group_id = self.group_ids.get(row['group'])
+            if group_id is None:
+                return None
+        if author_id is None:
+            return None
+        self.authors.add(author_id)
+        if group_id is not None:
+            self.groups.add(group_id)
+        pub_date = _date(row.get('pub_date')) or self.started
+        return Post(
+            id=row.get('id') or None,
+            text=row['text'],
+            author_id=author_id,
+            group_id=group_id,
+            image=row.get('image') or None,
+            pub_date=pub_date,
+            updated=_date(row.get('updated')) or pub_date,
+        )
+
+    def build_comments(self, row):
+        author_id = self.users.get(row['author'])
+        if author_id is None:
+            return None
+        return Comment(
+            post_id=int(row['post']),
+            author_id=author_id,
+            text=row['text'],
+            created=_date(row.get('created')) or self.started,
+        )
+
+    def build_follows(self, row):
+        user_id = self.users.get(row['user'])
+        author_id = self.users.get(row['author'])
+        if user_id is None or author_id is None or user_id == author_id:
+            return None
+        self.authors.update((user_id, author_id))
+        self.followers.add(user_id)
+        return Follow(user_id=user_id, author_id=author_id)
+
+    def run(self, rows):
+        self.started = timezone.now()
+        build = getattr(self, f'build_{self.kind}')
+        model = MODELS[self.kind]
+        began = time.monotonic()
+        rows = iter(rows)
+        row_type = ROW_TYPES.get(self.kind)
+        if row_type is not None:
+            rows = (row for row in rows
+                    if row.get('type', row_type) == row_type)
+        with preserved_dates(model):
+            while True:
+                chunk = list(islice(rows, self.chunk_size))
+                if not chunk:
+                    break
+                with transaction.atomic():
+                    for start in range(0, len(chunk), self.batch_size):
+                        batch = chunk[start:start + self.batch_size]
+                        objects = [obj for obj in map(build, batch)
+                                   if obj is not None]
+                        if self.kind == 'comments':
+                            objects = self.existing_posts_only(objects)
+                        self.skipped += len(batch) - len(objects)
+                        model.objects.bulk_create(
+                            objects,
+                            batch_size=self.insert_size(model, objects),
+                            ignore_conflicts=self.kind in IGNORE_CONFLICTS
+                        )
+                        if self.kind == 'posts':
+                            images = [post.image.name for post in objects
+                                      if post.image]
+                            blobs.add_references(images)
+                            for name in set(images):
+                                thumbnails.schedule(name)
+                        self.imported += len(objects)
+                self.report(self.imported, self.skipped,
+                            self.imported / (time.monotonic() - began))
+        self.finish()
+        return self.imported
+
+    def insert_size(self, model, objects):
+        """``batch_size``, но не больше, чем SQLite примет в одном INSERT.
+
+        В Django 2.2 явный ``batch_size`` не ограничивается пределом
+        бэкенда (500 SELECT в составном запросе, 999 параметров).
+        """
+        limit = connections[router.db_for_write(model)].ops.bulk_batch_size(
+            model._meta.concrete_fields, objects
+        )
+        return max(1, min(self.batch_size, limit))
+
+    def existing_posts_only(self, comments):
+        """Отбрасывает комментарии к несуществующим записям.
+
+        Заодно запоминает авторов и сообщества записей: их ленты
+        нужно будет инвалидировать.
+        """
+        posts = {
+            pk: (author_id, group_id)
+            for pk, author_id, group_id in Post.objects.filter(
+                pk__in={comment.post_id for comment in comments}
+            ).values_list('pk', 'author_id', 'group_id')
+        }
+        self.posts.update(posts)
+        for author_id, group_id in posts.values():
+            self.authors.add(author_id)
+            if group_id is not None:
+                self.groups.add(group_id)
+        return [comment for comment in comments if comment.post_id in posts]
+
+    @staticmethod
+    def in_chunks(function, ids):
+        ids = sorted(ids)
+        for start in range(0, len(ids), ID_CHUNK):
+            function(ids[start:start + ID_CHUNK])
+
+    def finish(self):
+        """Пересчёт того, что обычно поддерживают сигналы.
+
+        Только для затронутых импортом авторов, подписчиков и записей.
+        """
+        if self.kind == 'posts':
+            timeline.fill(author_ids=self.authors)
+        elif self.kind == 'follows':
+            timeline.fill(user_ids=self.followers)
+        if self.kind in ('posts', 'follows'):
+            self.in_chunks(stats.recompute, self.authors)
+        elif self.kind == 'comments':
+            self.in_chunks(stats.recount_comments, self.posts)
+        scopes = {feed_cache.author_scope(pk) for pk in self.authors}
+        scopes |= {feed_cache.group_scope(pk) for pk in self.groups}
+        if self.kind in ('posts', 'comments'):
+            scopes.add(feed_cache.GLOBAL)
+        feed_cache.bump(scopes)
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from posts import thumbnails
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = 'Создаёт миниатюры и WebP-варианты для уже загруженных картинок'
+
+    def handle(self, *args, **options):
+        names = Post.objects.exclude(image='').exclude(
+            image__isnull=True
+        ).order_by().values_list('image', flat=True).distinct()
+        created = missing = 0
+        for name in names.iterator():
+            if thumbnails.generate(name):
+                created += 1
+            else:
+                missing += 1
+        self.stdout.write(self.style.SUCCESS(
+            f'Миниатюр готово: {created}, без исходного файла: {missing}'
+        ))
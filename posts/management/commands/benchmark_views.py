@@ -0,0 +1,75 @@
+import json
+import platform
+import subprocess
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import benchmark
+from posts.models import Comment, Follow, Post, User
+
+
+def _commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = ('Замеряет p50/p95/p99, число SQL-запросов и размер ответа '
+            'основных страниц')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'views', nargs='*',
+            help='Из {}; по умолчанию — все'.format(', '.join(benchmark.VIEWS))
+        )
+        parser.add_argument('--requests', type=int, default=50)
+        parser.add_argument('--warmup', type=int, default=5)
+        parser.add_argument(
+            '--cold', action='store_true',
+            help='Строить страницы заново: сменить эпоху кэша перед запросом'
+        )
+        parser.add_argument(
+            '--json', action='store_true',
+            help='Вывести отчёт в JSON для сравнения коммитов'
+        )
+
+    def handle(self, *args, **options):
+        unknown = set(options['views']) - set(benchmark.VIEWS)
+        if unknown:
+            raise CommandError(
+                'Неизвестные страницы: ' + ', '.join(sorted(unknown))
+            )
+        report = benchmark.run(
+            views=options['views'] or benchmark.VIEWS,
+            requests=options['requests'],
+            warmup=options['warmup'],
+            cold=options['cold']
+        )
+        if options['json']:
+            self.stdout.write(json.dumps({
+                'commit': _commit(),
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'cold': options['cold'],
+                'rows': {
+                    model._meta.label: model.objects.count()
+                    for model in (User, Post, Comment, Follow)
+                },
+                'views': report,
+            }, indent=2))
+            return
+        self.stdout.write(
+            f'{"view":<14}{"p50":>9}{"p95":>9}{"p99":>9}'
+            f'{"queries":>9}{"bytes":>10}'
+        )
+        for view, row in report.items():
+            self.stdout.write(
+                f'{view:<14}{row["p50_ms"]:>9.1f}{row["p95_ms"]:>9.1f}'
+                f'{row["p99_ms"]:>9.1f}{row["queries"]:>9}{row["bytes"]:>10}'
+            )
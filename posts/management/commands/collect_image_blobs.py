@@ -0,0 +1,21 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from posts import blobs
+
+
+class Command(BaseCommand):
+    help = 'Удаляет файлы картинок, на которые не ссылается ни одна запись'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grace-minutes',
+            type=int,
+            default=int(blobs.GRACE_PERIOD.total_seconds() // 60),
+            help='Не трогать файлы, потерявшие ссылки недавно'
+        )
+
+    def handle(self, *args, **options):
+        count = blobs.collect(timedelta(minutes=options['grace_minutes']))
+        self.stdout.write(self.style.SUCCESS(f'Удалено файлов: {count}'))
@@ -0,0 +1,47 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import exporter
+from posts.models import Group, User
+
+
+class Command(BaseCommand):
+    help = ('Потоково выгружает записи автора или сообщества вместе с '
+            'комментариями к ним (любых авторов) в JSONL или ZIP')
+
+    def add_arguments(self, parser):
+        scope = parser.add_mutually_exclusive_group(required=True)
+        scope.add_argument('--author', help='username автора')
+        scope.add_argument('--group', help='slug сообщества')
+        parser.add_argument(
+            '--format', choices=list(exporter.FORMATS), default='jsonl'
+        )
+        parser.add_argument(
+            '--output', default='-', help='Файл или «-» для stdout'
+        )
+
+    def handle(self, *args, **options):
+        if options['author']:
+            author = User.objects.filter(username=options['author']).first()
+            if author is None:
+                raise CommandError(f'Нет автора {options["author"]}')
+            scope = {'author': author}
+        else:
+            group = Group.objects.filter(slug=options['group']).first()
+            if group is None:
+                raise CommandError(f'Нет сообщества {options["group"]}')
+            scope = {'group': group}
+        chunks, _, _ = exporter.FORMATS[options['format']]
+        if options['output'] == '-':
+            stream = sys.stdout.buffer
+            for chunk in chunks(scope):
+                stream.write(chunk)
+            stream.flush()
+            return
+        with open(options['output'], 'wb') as stream:
+            for chunk in chunks(scope):
+                stream.write(chunk)
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово: {options["output"]}'
+        ))
@@ -0,0 +1,57 @@
+import os
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import importer
+
+
+class Command(BaseCommand):
+    help = ('Потоково загружает пользователей, сообщества, записи, '
+            'комментарии или подписки из JSONL или CSV; из выгрузки '
+            'export_content берутся только строки нужного type')
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=list(importer.MODELS))
+        parser.add_argument('path', help='Файл или «-» для stdin')
+        parser.add_argument(
+            '--format', choices=('jsonl', 'csv'),
+            help='По умолчанию — по расширению файла'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=importer.BATCH_SIZE,
+            help='Строк в одном INSERT (не больше, чем примет SQLite)'
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=importer.CHUNK_SIZE,
+            help='Строк в одной транзакции'
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or (
+            'csv' if path.endswith('.csv') else 'jsonl'
+        )
+        if path != '-' and not os.path.exists(path):
+            raise CommandError(f'Нет файла {path}')
+
+        def report(imported, skipped, rate):
+            self.stdout.write(
+                f'{options["kind"]}: {imported} загружено, '
+                f'{skipped} пропущено, {rate:.0f} строк/с'
+            )
+
+        task = importer.Importer(
+            options['kind'],
+            batch_size=options['batch_size'],
+            chunk_size=options['chunk_size'],
+            report=report
+        )
+        if path == '-':
+            imported = task.run(importer.read_rows(sys.stdin, fmt))
+        else:
+            with open(path, newline='', encoding='utf-8') as stream:
+                imported = task.run(importer.read_rows(stream, fmt))
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово: {imported} загружено, {task.skipped} пропущено'
+        ))
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from posts import search
+
+
+class Command(BaseCommand):
+    help = ('Пересоздаёт триггеры полнотекстового поиска '
+            'и перестраивает индекс')
+
+    def handle(self, *args, **options):
+        search.install()
+        self.stdout.write(self.style.SUCCESS('Поисковый индекс перестроен'))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from posts import stats
+
+
+class Command(BaseCommand):
+    help = 'Сверяет сохранённые счётчики комментариев с фактическими'
+
+    def handle(self, *args, **options):
+        count = stats.recount_comments()
+        self.stdout.write(self.style.SUCCESS(
+            f'Счётчики комментариев сверены, записей: {count}'
+        ))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from posts import stats
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счётчики подписчиков, подписок и записей'
+
+    def handle(self, *args, **options):
+        count = stats.recompute()
+        self.stdout.write(self.style.SUCCESS(
+            f'Счётчики пересчитаны, пользователей: {count}'
+        ))
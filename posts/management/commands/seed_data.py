@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand
+
+from posts.seeding import Seeder
+
+
+class Command(BaseCommand):
+    help = ('Генерирует пользователей, сообщества, записи, комментарии и '
+            'подписки с реалистичными перекосами для замеров')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=20)
+        parser.add_argument('--posts', type=int, default=20000)
+        parser.add_argument('--comments', type=int, default=50000)
+        parser.add_argument(
+            '--follows', type=int, default=20,
+            help='Среднее число подписок одного пользователя'
+        )
+        parser.add_argument(
+            '--days', type=int, default=365,
+            help='За сколько дней назад раскидать даты записей'
+        )
+        parser.add_argument(
+            '--prefix', default='seed',
+            help='Префикс имён пользователей и slug сообществ'
+        )
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        def report(kind, imported, skipped, rate):
+            self.stdout.write(
+                f'{kind}: {imported} загружено, {skipped} пропущено, '
+                f'{rate:.0f} строк/с'
+            )
+
+        counts = Seeder(
+            users=options['users'],
+            groups=options['groups'],
+            posts=options['posts'],
+            comments=options['comments'],
+            follows=options['follows'],
+            days=options['days'],
+            prefix=options['prefix'],
+            seed=options['seed'],
+            report=report
+        ).run()
+        self.stdout.write(self.style.SUCCESS('Готово: ' + ', '.join(
+            f'{kind} {count}' for kind, count in counts.items()
+        )))
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+class Command(BaseCommand):
+    help = ('Обслуживание SQLite: контрольная точка WAL, '
+            'PRAGMA optimize и, по запросу, полный ANALYZE')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+        parser.add_argument(
+            '--analyze', action='store_true',
+            help='Пересчитать статистику всех индексов (долго на больших '
+                 'таблицах)'
+        )
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        if connection.vendor != 'sqlite':
+            raise CommandError('Команда работает только с SQLite')
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+            busy, log_pages, checkpointed = cursor.fetchone()
+            if options['analyze']:
+                cursor.execute('ANALYZE')
+            cursor.execute('PRAGMA optimize')
+        self.stdout.write(self.style.SUCCESS(
+            f'Контрольная точка: {checkpointed} из {log_pages} страниц'
+            + (' (база занята)' if busy else '')
+        ))
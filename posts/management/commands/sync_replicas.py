@@ -0,0 +1,25 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import replicas
+
+
+class Command(BaseCommand):
+    help = 'Копирует основную базу SQLite в файлы реплик для чтения'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'aliases', nargs='*',
+            help='Алиасы реплик; по умолчанию все из REPLICA_DATABASES'
+        )
+
+    def handle(self, *args, **options):
+        aliases = options['aliases'] or settings.REPLICA_DATABASES
+        for alias in aliases:
+            database = settings.DATABASES.get(alias)
+            if database is None:
+                raise CommandError(f'Нет базы {alias}')
+            replicas.sync(database['NAME'])
+            self.stdout.write(self.style.SUCCESS(
+                f'Реплика {alias} обновлена'
+            ))
@@ -0,0 +1,262 @@
+"""Метрики запросов в формате Prometheus.
+
+``MetricsMiddleware`` по имени URL считает гистограммы времени ответа и
+размера тела, число и время SQL-запросов, время отрисовки шаблонов и
+ответы по статусам. Каждый поток пишет только в своё хранилище, поэтому
+блокировок на пути запроса нет; ``export`` суммирует хранилища всех
+потоков процесса, а хранилища завершившихся потоков сливает в общий
+итог и забывает — при потоке на запрос их число не растёт. Счётчики
+живут в памяти процесса: при нескольких воркерах каждый отдаёт свои,
+их складывает Prometheus.
+
+Ограничения:
+
+* время шаблонов меряется подменой ``django.template.base.Template._render``
+  на весь процесс (так же устроена тестовая инструментовка Django);
+  подмена ставится один раз при создании middleware;
+* размер потоковых ответов (``StreamingHttpResponse``: API, выгрузки)
+  не учитывается — их тело читается уже после выхода из middleware;
+  по той же причине не учитываются и запросы к БД, сделанные при
+  чтении такого тела.
+"""
+import hmac
+import threading
+from bisect import bisect_left
+from contextlib import ExitStack
+from time import perf_counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.http import Http404, HttpResponse
+from django.template.base import Template
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+SIZE_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+UNMATCHED = '<unmatched>'
+
+_local = threading.local()
+# Хранилища живых потоков по объекту потока; вставка в dict атомарна,
+# пути запроса блокировка не нужна. Лок только между сборщиками.
+_stores = {}
+_retired = {}
+_collect_lock = threading.Lock()
+_original_render = None
+
+
+class ViewStats:
+    __slots__ = ('requests', 'seconds', 'durations', 'bytes', 'sizes',
+                 'queries', 'query_seconds', 'render_seconds', 'statuses')
+
+    def __init__(self):
+        self.requests = 0
+        self.seconds = 0.0
+        self.durations = [0] * (len(DURATION_BUCKETS) + 1)
+        self.bytes = 0
+        self.sizes = [0] * (len(SIZE_BUCKETS) + 1)
+        self.queries = 0
+        self.query_seconds = 0.0
+        self.render_seconds = 0.0
+        self.statuses = {}
+
+
+class QueryTimer:
+    """``execute_wrapper`` одного запроса: число и время SQL."""
+
+    __slots__ = ('count', 'seconds')
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.seconds += perf_counter() - started
+
+
+def _store():
+    store = getattr(_local, 'store', None)
+    if store is None:
+        store = _local.store = {}
+        _stores[threading.current_thread()] = store
+    return store
+
+
+def _timed_render(self, context):
+    """Время только внешней отрисовки: include внутри уже учтены."""
+    if getattr(_local, 'rendering', False):
+        return _original_render(self, context)
+    _local.rendering = True
+    started = perf_counter()
+    try:
+        return _original_render(self, context)
+    finally:
+        _local.rendering = False
+        _local.render_seconds = (getattr(_local, 'render_seconds', 0.0)
+                                 + perf_counter() - started)
+
+
+def instrument_templates():
+    global _original_render
+    if _original_render is None:
+        _original_render = Template._render
+        Template._render = _timed_render
+
+
+class MetricsMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.aliases = [DEFAULT_DB_ALIAS, *settings.REPLICA_DATABASES]
+        instrument_templates()
+
+    def __call__(self, request):
+        timer = QueryTimer()
+        _local.render_seconds = 0.0
+        started = perf_counter()
+        with ExitStack() as stack:
+            for alias in self.aliases:
+                stack.enter_context(connections[alias].execute_wrapper(timer))
+            response = self.get_response(request)
+        elapsed = perf_counter() - started
+        match = request.resolver_match
+        view = match.view_name if match else UNMATCHED
+        stats = _store().get(view)
+        if stats is None:
+            stats = _store()[view] = ViewStats()
+        stats.requests += 1
+        stats.seconds += elapsed
+        stats.durations[bisect_left(DURATION_BUCKETS, elapsed)] += 1
+        # Тело потокового ответа ещё не прочитано: размер неизвестен
+        if not response.streaming:
+            size = len(response.content)
+            stats.bytes += size
+            stats.sizes[bisect_left(SIZE_BUCKETS, size)] += 1
+        stats.queries += timer.count
+        stats.query_seconds += timer.seconds
+        stats.render_seconds += _local.render_seconds
+        status = response.status_code
+        stats.statuses[status] = stats.statuses.get(status, 0) + 1
+        return response
+
+
+def _add(total, store):
+    for view, stats in list(store.items()):
+        summed = total.setdefault(view, ViewStats())
+        summed.requests += stats.requests
+        summed.seconds += stats.seconds
+        summed.bytes += stats.bytes
+        summed.queries += stats.queries
+        summed.query_seconds += stats.query_seconds
+        summed.render_seconds += stats.render_seconds
+        for index, count in enumerate(stats.durations):
+            summed.durations[index] += count
+        for index, count in enumerate(stats.sizes):
+            summed.sizes[index] += count
+        for status, count in list(stats.statuses.items()):
+            summed.statuses[status] = summed.statuses.get(status, 0) + count
+
+
+def collect():
+    """``{view: ViewStats}`` — итог завершившихся потоков плюс живые.
+
+    Хранилище завершившегося потока больше не меняется: оно сливается
+    в ``_retired`` и удаляется.
+    """
+    with _collect_lock:
+        for thread, store in list(_stores.items()):
+            if not thread.is_alive():
+                _add(_retired, store)
+                del _stores[thread]
+        total = {}
+        _add(total, _retired)
+        for store in list(_stores.values()):
+            _add(total, store)
+    return total
+
+
+def _labels(**labels):
+    return '{' + ','.join(
+        '{}="{}"'.format(name, str(value).replace('\\', r'\\')
+                         .replace('"', r'\"').replace('\n', r'\n'))
+        for name, value in labels.items()
+    ) + '}'
+
+
+def _histogram(lines, name, view, buckets, counts, total, count):
+    cumulative = 0
+    for bound, observed in zip(buckets + ('+Inf',), counts):
+        cumulative += observed
+        lines.append(f'{name}_bucket{_labels(view=view, le=bound)} '
+                     f'{cumulative}')
+    lines.append(f'{name}_sum{_labels(view=view)} {total}')
+    lines.append(f'{name}_count{_labels(view=view)} {count}')
+
+
+def render():
+    """Текст в формате экспозиции Prometheus 0.0.4."""
+    views = sorted(collect().items())
+    lines = []
+
+    def family(name, kind, text):
+        lines.append(f'# HELP {name} {text}')
+        lines.append(f'# TYPE {name} {kind}')
+
+    family('yatube_http_request_duration_seconds', 'histogram',
+           'Request latency by URL name.')
+    for view, stats in views:
+        _histogram(lines, 'yatube_http_request_duration_seconds', view,
+                   DURATION_BUCKETS, stats.durations, stats.seconds,
+                   stats.requests)
+    family('yatube_http_response_size_bytes', 'histogram',
+           'Non-streaming response body size by URL name.')
+    for view, stats in views:
+        _histogram(lines, 'yatube_http_response_size_bytes', view,
+                   SIZE_BUCKETS, stats.sizes, stats.bytes, sum(stats.sizes))
+    family('yatube_http_responses_total', 'counter',
+           'Responses by URL name and status code.')
+    for view, stats in views:
+        for status, count in sorted(stats.statuses.items()):
+            lines.append('yatube_http_responses_total'
+                         f'{_labels(view=view, status=status)} {count}')
+    for name, field, text in (
+        ('yatube_db_queries_total', 'queries', 'SQL queries by URL name.'),
+        ('yatube_db_query_seconds_total', 'query_seconds',
+         'Time spent in SQL by URL name.'),
+        ('yatube_template_render_seconds_total', 'render_seconds',
+         'Time spent rendering templates by URL name.'),
+    ):
+        family(name, 'counter', text)
+        for view, stats in views:
+            lines.append(f'{name}{_labels(view=view)} '
+                         f'{getattr(stats, field)}')
+    if hasattr(cache, 'stats'):
+        family('yatube_cache_requests_total', 'counter',
+               'Cache lookups by tier and result.')
+        for tier, counters in sorted(cache.stats().items()):
+            for result, key in (('hit', 'hits'), ('miss', 'misses')):
+                lines.append('yatube_cache_requests_total'
+                             f'{_labels(tier=tier, result=result)} '
+                             f'{counters[key]}')
+    return '\n'.join(lines) + '\n'
+
+
+def allowed(request):
+    """С токеном — только по нему, иначе по адресу из METRICS_ALLOWED_IPS."""
+    if settings.METRICS_TOKEN:
+        return hmac.compare_digest(
+            request.META.get('HTTP_AUTHORIZATION', '').encode(),
+            f'Bearer {settings.METRICS_TOKEN}'.encode()
+        )
+    return request.META.get('REMOTE_ADDR') in settings.METRICS_ALLOWED_IPS
+
+
+def export(request):
+    """Страница для сбора метрик; кому она доступна, решает ``allowed``."""
+    if not allowed(request):
+        raise Http404
+    return HttpResponse(render(), content_type=CONTENT_TYPE)
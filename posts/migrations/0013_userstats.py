@@ -0,0 +1,59 @@
+# Generated by Django 2.2.6 on 2026-10-18 04:24
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+import django.db.models.deletion
+
+
+def fill_stats(apps, schema_editor):
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    Follow = apps.get_model('posts', 'Follow')
+    Post = apps.get_model('posts', 'Post')
+    UserStats = apps.get_model('posts', 'UserStats')
+
+    def count(model, field):
+        rows = model.objects.filter(
+            **{field: models.OuterRef('pk')}
+        ).order_by().values(field).annotate(
+            count=models.Count('*')
+        ).values('count')
+        return Coalesce(
+            models.Subquery(rows, output_field=models.IntegerField()), 0
+        )
+
+    users = User.objects.order_by().annotate(
+        followers_count=count(Follow, 'author'),
+        following_count=count(Follow, 'user'),
+        posts_count=count(Post, 'author'),
+    ).values_list('pk', 'followers_count', 'following_count', 'posts_count')
+    UserStats.objects.bulk_create(
+        (UserStats(user_id=pk, followers_count=followers,
+                   following_count=following, posts_count=posts)
+         for pk, followers, following, posts in users.iterator()),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0011_update_proxy_permissions'),
+        ('posts', '0012_timelineentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('followers_count', models.PositiveIntegerField(default=0, verbose_name='Подписчиков')),
+                ('following_count', models.PositiveIntegerField(default=0, verbose_name='Подписок')),
+                ('posts_count', models.PositiveIntegerField(default=0, verbose_name='Записей')),
+            ],
+            options={
+                'verbose_name': 'Статистика пользователя',
+                'verbose_name_plural': 'Статистика пользователей',
+            },
+        ),
+        migrations.RunPython(fill_stats, migrations.RunPython.noop),
+    ]
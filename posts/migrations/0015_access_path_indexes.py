@@ -0,0 +1,52 @@
+# Generated by Django 2.2.6 on 2026-10-18 04:26
+
+from django.db import migrations, models
+from django.db.models.functions import Greatest
+
+
+def dedup_follows(apps, schema_editor):
+    Follow = apps.get_model('posts', 'Follow')
+    UserStats = apps.get_model('posts', 'UserStats')
+    duplicates = Follow.objects.values('user', 'author').annotate(
+        keep=models.Min('id'),
+        total=models.Count('id'),
+    ).filter(total__gt=1)
+    for row in duplicates:
+        Follow.objects.filter(
+            user=row['user'],
+            author=row['author']
+        ).exclude(id=row['keep']).delete()
+        extra = row['total'] - 1
+        UserStats.objects.filter(user_id=row['user']).update(
+            following_count=Greatest(models.F('following_count') - extra, 0)
+        )
+        UserStats.objects.filter(user_id=row['author']).update(
+            followers_count=Greatest(models.F('followers_count') - extra, 0)
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0014_post_comment_count'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['post', 'created', 'id'], name='comment_post_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['author', 'pub_date', 'id'], name='post_author_pub_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['group', 'pub_date', 'id'], name='post_group_pub_date_idx'),
+        ),
+        migrations.RunPython(dedup_follows, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='follow',
+            constraint=models.UniqueConstraint(fields=('user', 'author'), name='unique_follow'),
+        ),
+    ]
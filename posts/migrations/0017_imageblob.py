@@ -0,0 +1,49 @@
+# Generated by Django 2.2.6 on 2026-10-18 04:33
+
+from django.db import migrations, models
+import posts.storage
+
+
+def count_references(apps, schema_editor):
+    ImageBlob = apps.get_model('posts', 'ImageBlob')
+    Post = apps.get_model('posts', 'Post')
+    references = Post.objects.exclude(image='').exclude(
+        image__isnull=True
+    ).order_by().values('image').annotate(count=models.Count('*'))
+    ImageBlob.objects.bulk_create(
+        (ImageBlob(name=row['image'], ref_count=row['count'])
+         for row in references.iterator()),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0016_post_updated'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImageBlob',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('ref_count', models.PositiveIntegerField(default=0)),
+                ('updated', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Файл картинки',
+                'verbose_name_plural': 'Файлы картинок',
+            },
+        ),
+        migrations.AlterField(
+            model_name='post',
+            name='image',
+            field=models.ImageField(blank=True, null=True, storage=posts.storage.ContentAddressedStorage(), upload_to='posts/'),
+        ),
+        migrations.AddIndex(
+            model_name='imageblob',
+            index=models.Index(fields=['ref_count', 'updated'], name='imageblob_orphans_idx'),
+        ),
+        migrations.RunPython(count_references, migrations.RunPython.noop),
+    ]
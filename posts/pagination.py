@@ -0,0 +1,177 @@
+import base64
+import binascii
+
+from django.core.exceptions import ValidationError
+from django.core.paginator import Page, Paginator
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+
+def _loaded(queryset, rows):
+    """``queryset`` с уже прочитанными ``rows``: второго запроса не будет.
+
+    Так же ``prefetch_related`` в Django заполняет кэш QuerySet'а.
+    """
+    queryset._result_cache = rows
+    queryset._prefetch_done = True
+    return queryset
+
+
+class CursorPage:
+    """Страница курсорной пагинации: только «вперёд» и «назад»."""
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return f'<CursorPage of {len(self.object_list)} items>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class CursorPaginator:
+    """Keyset-пагинация по паре (field, id) в порядке убывания.
+
+    Вместо OFFSET и COUNT(*) каждая страница — диапазонное чтение индекса
+    по (field, id) от позиции курсора, поэтому её стоимость не зависит
+    от глубины.
+
+    Если индекс лежит в связанной таблице, ``keys`` — пути к её колонкам
+    с теми же значениями, что (field, id) записи, а ``scope`` — условие
+    на ту же таблицу: оно ставится в один ``filter()`` с курсором, иначе
+    Django соединил бы таблицу второй раз.
+    """
+
+    def __init__(self, queryset, per_page, field='pub_date', keys=None,
+                 scope=None):
+        self.queryset = queryset
+        self.per_page = per_page
+        self.field = field
+        self.model_field = queryset.model._meta.get_field(field)
+        self.keys = keys or (field, 'pk')
+        self.scope = scope or Q()
+
+    def encode(self, obj):
+        return self.encode_position(self.model_field.value_from_object(obj),
+                                    obj.pk)
+
+    def encode_position(self, value, pk):
+        """Курсор по значению поля и id, например для строк ``values()``."""
+        if hasattr(value, 'isoformat'):
+            value = value.isoformat()
+        raw = f'{value}|{pk}'.encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+    def decode(self, cursor):
+        try:
+            raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+            value, pk = raw.decode().rsplit('|', 1)
+            return self.model_field.to_python(value), int(pk)
+        except (binascii.Error, UnicodeDecodeError, ValueError,
+                ValidationError):
+            return None
+
+    def older_than(self, position=None):
+        """Записи старше позиции ``(value, pk)`` от новых к старым."""
+        key, pk_key = self.keys
+        conditions = []
+        if position is not None:
+            value, pk = position
+            conditions = [
+                Q(**{f'{key}__lte': value}),
+                Q(**{f'{key}__lt': value}) | Q(**{f'{pk_key}__lt': pk}),
+            ]
+        return self.queryset.filter(self.scope, *conditions).order_by(
+            f'-{key}', f'-{pk_key}'
+        )
+
+    def page(self, before=None, after=None):
+        """Записи старше курсора ``before`` или новее курсора ``after``.
+
+        Страница читается одним запросом на ``per_page + 1`` строк: по
+        лишней строке видно, есть ли записи дальше. ``object_list`` —
+        QuerySet с уже загруженными строками.
+        """
+        field = self.field
+        key, pk_key = self.keys
+        position = self.decode(after) if after else None
+        if position is not None:
+            value, pk = position
+            # Условие записано так, чтобы ведущая часть была диапазоном
+            # по индексу: field >= value AND (field > value OR id > pk).
+            window = self.queryset.filter(
+                self.scope,
+                Q(**{f'{key}__gte': value}),
+                Q(**{f'{key}__gt': value}) | Q(**{f'{pk_key}__gt': pk}),
+            ).order_by(key, pk_key)
+            rows = list(window[:self.per_page + 1])
+            has_more = len(rows) > self.per_page
+            rows = rows[:self.per_page][::-1]
+            object_list = self.queryset.filter(
+                pk__in=[row.pk for row in rows]
+            ).order_by(f'-{field}', '-pk')
+            return CursorPage(
+                _loaded(object_list, rows),
+                next_cursor=self.encode(rows[-1]) if rows else None,
+                previous_cursor=(self.encode(rows[0])
+                                 if rows and has_more else None),
+            )
+        position = self.decode(before) if before else None
+        window = self.older_than(position)
+        rows = list(window[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        return CursorPage(
+            _loaded(window[:self.per_page], rows),
+            next_cursor=self.encode(rows[-1]) if has_more else None,
+            previous_cursor=(self.encode(rows[0])
+                             if rows and position is not None else None),
+        )
+
+
+def first_page(cursors):
+    """Первая страница ``cursors`` и обычные Paginator и Page над ней.
+
+    ``(paginator, page, cursor_page)``: ``page`` — Page из тех же строк,
+    что ``cursor_page``, для кода, который ждёт ``Paginator``. Число
+    записей paginator считает, только если его спросят, поэтому
+    навигацию строят по ``cursor_page``.
+    """
+    cursor_page = cursors.page()
+    paginator = Paginator(cursors.older_than(), cursors.per_page)
+    return (paginator, Page(cursor_page.object_list, 1, paginator),
+            cursor_page)
+
+
+class CappedCountPaginator(Paginator):
+    """Paginator без COUNT(*) по всей таблице.
+
+    Строки считаются не дальше ``count_limit``: это чтение не больше
+    ``count_limit`` записей индекса. Число никогда не больше настоящего,
+    поэтому последняя страница не бывает пустой; в большей таблице
+    страницы заканчиваются на ``count_limit`` строках, остальное
+    находится фильтрами и поиском.
+    """
+    count_limit = 10000
+
+    @cached_property
+    def count(self):
+        return self.object_list[:self.count_limit].count()
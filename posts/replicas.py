@@ -0,0 +1,106 @@
+"""Чтение с реплик для представлений, которые только читают.
+
+Представления, помеченные ``replica_reads``, на время безопасного запроса
+читают со случайной реплики из ``settings.REPLICA_DATABASES``. После
+любого изменяющего запроса ``PinPrimaryMiddleware`` ставит cookie, и
+``REPLICA_PIN_SECONDS`` секунд этот браузер читает с основной базы —
+так автор сразу видит свою запись, даже если реплика отстаёт.
+"""
+import random
+import sqlite3
+import threading
+from contextlib import contextmanager
+from functools import wraps
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from . import feed_cache
+
+PIN_COOKIE = 'pin_primary'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+SYNC_PAGES = 1024
+REPLICATED_APPS = ('posts',)
+
+_state = threading.local()
+
+
+@contextmanager
+def reading_from_replica():
+    previous = getattr(_state, 'replica', None)
+    _state.replica = random.choice(settings.REPLICA_DATABASES)
+    try:
+        yield _state.replica
+    finally:
+        _state.replica = previous
+
+
+def replica_reads(view):
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if (not settings.REPLICA_DATABASES
+                or request.method not in SAFE_METHODS
+                or PIN_COOKIE in request.COOKIES):
+            return view(request, *args, **kwargs)
+        with reading_from_replica():
+            return view(request, *args, **kwargs)
+    return wrapper
+
+
+class PinPrimaryMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if request.method not in SAFE_METHODS:
+            response.set_cookie(
+                PIN_COOKIE, '1',
+                max_age=settings.REPLICA_PIN_SECONDS,
+                httponly=True,
+                samesite='Lax'
+            )
+        return response
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        # Реплика обновляется только sync_replicas: сессии, пользователи и
+        # прочие служебные таблицы на ней устаревают, поэтому с неё
+        # читаются лишь модели ленты.
+        if model._meta.app_label not in REPLICATED_APPS:
+            return None
+        return getattr(_state, 'replica', None)
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Схема и данные приходят на реплику целиком из основной базы.
+        if db in settings.DATABASES and db != DEFAULT_DB_ALIAS:
+            return False
+        return None
+
+
+def sync(target, using=DEFAULT_DB_ALIAS, pages=SYNC_PAGES):
+    """Копирует базу ``using`` в файл ``target`` через backup API SQLite.
+
+    Копирование идёт порциями по ``pages`` страниц: между ними основная
+    база доступна на запись, а читатели реплики видят либо старую, либо
+    новую согласованную копию.
+
+    После копирования меняется эпоха кэша: версии лент сигналы меняют
+    сразу при записи, и страница, собранная с ещё отставшей реплики,
+    иначе так и отдавалась бы под новой версией.
+    """
+    connection = connections[using]
+    connection.ensure_connection()
+    destination = sqlite3.connect(target)
+    try:
+        connection.connection.backup(destination, pages=pages)
+    finally:
+        destination.close()
+    feed_cache.bump_epoch()
@@ -0,0 +1,146 @@
+"""Полнотекстовый поиск по записям и комментариям на SQLite FTS5.
+
+Индексы — FTS5-таблицы с внешним содержимым (``content=``): текст не
+дублируется, а триггеры на исходных таблицах держат индекс в актуальном
+состоянии.
+"""
+import base64
+import binascii
+import re
+
+from django.db import connection
+from django.db.models.expressions import RawSQL
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+# Модели здесь не импортируются: модуль используется и из миграций.
+SOURCES = {
+    'posts': 'posts_post',
+    'comments': 'posts_comment',
+}
+MARK_START = '\x02'
+MARK_END = '\x03'
+SNIPPET_TOKENS = 16
+
+
+def fts_table(scope):
+    return f'{SOURCES[scope]}_fts'
+
+
+def install_sql(scope):
+    source = SOURCES[scope]
+    fts = fts_table(scope)
+    return [
+        f'CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5('
+        f"text, content='{source}', content_rowid='id', "
+        f"tokenize='unicode61 remove_diacritics 2')",
+        f'CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {source} '
+        f'BEGIN INSERT INTO {fts}(rowid, text) VALUES (new.id, new.text); '
+        f'END',
+        f'CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {source} '
+        f"BEGIN INSERT INTO {fts}({fts}, rowid, text) "
+        f"VALUES ('delete', old.id, old.text); END",
+        f'CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF text '
+        f'ON {source} '
+        f"BEGIN INSERT INTO {fts}({fts}, rowid, text) "
+        f"VALUES ('delete', old.id, old.text); "
+        f'INSERT INTO {fts}(rowid, text) VALUES (new.id, new.text); END',
+        f"INSERT INTO {fts}({fts}) VALUES ('rebuild')",
+    ]
+
+
+def uninstall_sql(scope):
+    fts = fts_table(scope)
+    return [f'DROP TRIGGER IF EXISTS {fts}_{suffix}'
+            for suffix in ('ai', 'ad', 'au')] + [f'DROP TABLE IF EXISTS {fts}']
+
+
+def install(using=connection):
+    """Создаёт индексы и триггеры и перестраивает индекс по данным.
+
+    Повторный вызов безопасен: так же восстанавливаются триггеры после
+    миграций, которые пересоздают таблицы записей или комментариев.
+    """
+    if using.vendor != 'sqlite':
+        return
+    with using.cursor() as cursor:
+        for scope in SOURCES:
+            for sql in install_sql(scope):
+                cursor.execute(sql)
+
+
+def uninstall(using=connection):
+    if using.vendor != 'sqlite':
+        return
+    with using.cursor() as cursor:
+        for scope in SOURCES:
+            for sql in uninstall_sql(scope):
+                cursor.execute(sql)
+
+
+def match_expression(query):
+    """Запрос пользователя как набор фраз FTS5: без синтаксических ошибок."""
+    words = re.findall(r'\w+', query)
+    return ' '.join('"{}"'.format(word.replace('"', '""')) for word in words)
+
+
+def matching(query, scope='posts'):
+    """Подзапрос id подходящих строк для фильтра ``pk__in``."""
+    fts = fts_table(scope)
+    return RawSQL(
+        f'SELECT rowid FROM {fts} WHERE {fts} MATCH %s',
+        [match_expression(query)]
+    )
+
+
+def highlight(snippet):
+    return mark_safe(
+        escape(snippet)
+        .replace(MARK_START, '<mark>')
+        .replace(MARK_END, '</mark>')
+    )
+
+
+def encode_cursor(rank, rowid):
+    raw = f'{rank!r}|{rowid}'.encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        rank, rowid = raw.decode().split('|')
+        return float(rank), int(rowid)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+
+
+def find(query, scope='posts', after=None, limit=10):
+    """Находит ``limit`` строк по рангу bm25 начиная с курсора ``after``.
+
+    Возвращает список ``(id, snippet)`` и курсор следующей страницы.
+    """
+    expression = match_expression(query)
+    if not expression:
+        return [], None
+    fts = fts_table(scope)
+    sql = (
+        f'SELECT rowid, rank, snippet({fts}, 0, %s, %s, %s, %s) '
+        f'FROM {fts} WHERE {fts} MATCH %s'
+    )
+    params = [MARK_START, MARK_END, '…', SNIPPET_TOKENS, expression]
+    position = decode_cursor(after) if after else None
+    if position is not None:
+        sql += ' AND (rank > %s OR (rank = %s AND rowid > %s))'
+        params += [position[0], position[0], position[1]]
+    sql += ' ORDER BY rank, rowid LIMIT %s'
+    params.append(limit + 1)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1][1], rows[-1][0])
+    hits = [(rowid, highlight(snippet)) for rowid, _, snippet in rows]
+    return hits, next_cursor
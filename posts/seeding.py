@@ -0,0 +1,137 @@
+"""Синтетические данные с перекосами, как на живом сайте.
+
+Популярность авторов и сообществ распределена по Ципфу: немногие
+авторы пишут большую часть записей и собирают большую часть
+подписчиков, немногие сообщества получают большую часть записей.
+Число комментариев к записи — распределение Парето, поэтому
+встречаются очень длинные обсуждения. Строки генерируются потоком и
+загружаются через ``importer``, который сам пересчитывает ленты и
+счётчики. Одно и то же ``seed`` даёт одни и те же данные.
+"""
+import random
+from datetime import timedelta
+from functools import partial
+from itertools import accumulate
+
+from django.db.models import Max
+from django.utils import timezone
+
+from .importer import Importer
+from .models import Post
+
+WORDS = (
+    'дневник', 'вечер', 'город', 'письмо', 'дорога', 'книга', 'сад',
+    'море', 'поезд', 'разговор', 'утро', 'зима', 'музыка', 'дом',
+    'история', 'друг', 'работа', 'мысль', 'память', 'осень',
+)
+# Доля записей без сообщества
+NO_GROUP_SHARE = 0.3
+
+
+def zipf_weights(count, exponent=1.1):
+    return list(accumulate(1 / rank ** exponent
+                           for rank in range(1, count + 1)))
+
+
+class Seeder:
+    def __init__(self, users=1000, groups=20, posts=20000, comments=50000,
+                 follows=20, days=365, prefix='seed', seed=0,
+                 report=None):
+        self.users = users
+        self.groups = groups
+        self.posts = posts
+        self.comments = comments
+        self.follows = follows
+        self.days = days
+        self.prefix = prefix
+        self.random = random.Random(seed)
+        self.report = report or (lambda kind, imported, skipped, rate: None)
+        self.now = timezone.now()
+        self.post_dates = []
+
+    def username(self, index):
+        return f'{self.prefix}{index}'
+
+    def text(self, low, high):
+        return ' '.join(self.random.choice(WORDS)
+                        for _ in range(self.random.randint(low, high)))
+
+    def user_rows(self):
+        for index in range(self.users):
+            yield {'username': self.username(index),
+                   'first_name': self.random.choice(WORDS).title()}
+
+    def group_rows(self):
+        for index in range(self.groups):
+            yield {'slug': f'{self.prefix}-group-{index}',
+                   'title': f'Сообщество {index}',
+                   'description': self.text(5, 20)}
+
+    def post_rows(self):
+        """Записи с явными id: на них потом ссылаются комментарии."""
+        first_id = (Post.objects.aggregate(last=Max('pk'))['last'] or 0) + 1
+        authors = zipf_weights(self.users)
+        groups = zipf_weights(self.groups)
+        span = timedelta(days=self.days).total_seconds()
+        for offset in range(self.posts):
+            author = self.random.choices(
+                range(self.users), cum_weights=authors
+            )[0]
+            group = None
+            if self.groups and self.random.random() >= NO_GROUP_SHARE:
+                group = f'{self.prefix}-group-' + str(self.random.choices(
+                    range(self.groups), cum_weights=groups
+                )[0])
+            age = self.random.random() * span
+            self.post_dates.append((first_id + offset, age))
+            yield {
+                'id': first_id + offset,
+                'text': self.text(10, 120),
+                'author': self.username(author),
+                'group': group,
+                'pub_date': (self.now - timedelta(seconds=age)).isoformat(),
+            }
+
+    def comment_rows(self):
+        """Комментарии к записям из ``post_rows``, веса по Парето."""
+        if not self.post_dates:
+            return
+        threads = list(accumulate(
+            self.random.paretovariate(1.2) for _ in self.post_dates
+        ))
+        for _ in range(self.comments):
+            post_id, age = self.random.choices(
+                self.post_dates, cum_weights=threads
+            )[0]
+            age *= self.random.random()
+            yield {
+                'post': post_id,
+                'author': self.username(self.random.randrange(self.users)),
+                'text': self.text(2, 30),
+                'created': (self.now - timedelta(seconds=age)).isoformat(),
+            }
+
+    def follow_rows(self):
+        """В среднем ``follows`` подписок на пользователя, авторы по Ципфу."""
+        authors = zipf_weights(self.users)
+        for index in range(self.users):
+            count = min(
+                self.users - 1,
+                int(self.random.expovariate(1 / self.follows))
+            ) if self.follows else 0
+            for author in set(self.random.choices(
+                range(self.users), cum_weights=authors, k=count
+            )):
+                yield {'user': self.username(index),
+                       'author': self.username(author)}
+
+    def run(self):
+        counts = {}
+        for kind, rows in (('users', self.user_rows()),
+                           ('groups', self.group_rows()),
+                           ('posts', self.post_rows()),
+                           ('comments', self.comment_rows()),
+                           ('follows', self.follow_rows())):
+            task = Importer(kind, report=partial(self.report, kind))
+            counts[kind] = task.run(rows)
+        return counts
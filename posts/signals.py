@@ -0,0 +1,129 @@
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import blobs, feed_cache, sqlite, stats, thumbnails, timeline
+from .models import Comment, Follow, Group, Post, User
+
+
+@receiver(connection_created)
+def connection_opened(sender, connection, **kwargs):
+    sqlite.apply_pragmas(connection)
+
+
+def expire_cache(sender, **kwargs):
+    feed_cache.bump_epoch()
+
+
+@receiver(pre_save, sender=Post)
+def post_changing(sender, instance, **kwargs):
+    if instance.pk is not None:
+        previous = Post.objects.filter(
+            pk=instance.pk
+        ).values_list('group_id', 'image').first()
+        if previous is not None:
+            (instance._previous_group_id,
+             instance._previous_image) = previous
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, **kwargs):
+    if created:
+        timeline.fan_out(instance)
+        stats.change(instance.author_id, 'posts_count', 1)
+    image = instance.image.name or ''
+    previous_image = getattr(instance, '_previous_image', None) or ''
+    if image != previous_image:
+        if image:
+            blobs.add_reference(image)
+            # Откуда бы ни пришла картинка: форма, админка, shell
+            thumbnails.schedule(image)
+        if previous_image:
+            blobs.drop_reference(previous_image)
+    feed_cache.bump(feed_cache.post_scopes(
+        instance, getattr(instance, '_previous_group_id', None)
+    ))
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    stats.change(instance.author_id, 'posts_count', -1)
+    if instance.image:
+        blobs.drop_reference(instance.image.name)
+    feed_cache.bump(feed_cache.post_scopes(instance))
+
+
+def follow_scopes(follow):
+    # Счётчики подписок видны на страницах обоих профилей.
+    return {feed_cache.author_scope(follow.user_id),
+            feed_cache.author_scope(follow.author_id)}
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, **kwargs):
+    if created:
+        timeline.backfill(instance.user_id, instance.author_id)
+        stats.change(instance.user_id, 'following_count', 1)
+        stats.change(instance.author_id, 'followers_count', 1)
+        feed_cache.bump(follow_scopes(instance))
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    timeline.prune(instance.user_id, instance.author_id)
+    stats.change(instance.user_id, 'following_count', -1)
+    stats.change(instance.author_id, 'followers_count', -1)
+    feed_cache.bump(follow_scopes(instance))
+
+
+@receiver(post_save, sender=Group)
+def group_saved(sender, instance, created, **kwargs):
+    scopes = {feed_cache.group_scope(instance.id),
+              feed_cache.group_card_scope(instance.id)}
+    if not created:
+        # Название сообщества есть в карточках главной, профилей и
+        # страниц записей его авторов.
+        scopes.add(feed_cache.GLOBAL)
+        scopes |= {feed_cache.author_scope(pk) for pk in Post.objects.filter(
+            group=instance
+        ).values_list('author_id', flat=True).distinct()}
+    feed_cache.bump(scopes)
+
+
+def user_scopes(user):
+    """Ленты, где видно имя пользователя: его записи и комментарии."""
+    scopes = {feed_cache.GLOBAL}
+    scopes |= {feed_cache.group_scope(pk) for pk in user.posts.filter(
+        group__isnull=False
+    ).values_list('group_id', flat=True).distinct()}
+    scopes |= {feed_cache.author_scope(pk) for pk in Comment.objects.filter(
+        author=user
+    ).values_list('post__author_id', flat=True).distinct()}
+    return scopes
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, update_fields=None, **kwargs):
+    # Вход пользователя меняет только last_login — его страницы те же.
+    if update_fields == frozenset({'last_login'}):
+        return
+    scopes = {feed_cache.author_scope(instance.id),
+              feed_cache.author_card_scope(instance.id)}
+    if not created:
+        scopes |= user_scopes(instance)
+    feed_cache.bump(scopes)
+
+
+@receiver(post_save, sender=Comment)
+def comment_created(sender, instance, created, **kwargs):
+    if created:
+        stats.change_comments(instance.post_id, 1)
+        feed_cache.bump(feed_cache.post_scopes(instance.post))
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    stats.change_comments(instance.post_id, -1)
+    post = Post.objects.filter(pk=instance.post_id).first()
+    if post is not None:
+        feed_cache.bump(feed_cache.post_scopes(post))
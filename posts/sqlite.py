@@ -0,0 +1,63 @@
+"""Настройка соединений SQLite прагмами из ``settings.SQLITE_PRAGMAS``.
+
+Прагмы применяются к каждому новому соединению (сигнал
+``connection_created``); проверка ``posts.I001`` показывает, какие
+значения действуют на самом деле.
+"""
+from django.conf import settings
+from django.core.checks import Info, Tags, Warning, register
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# Прагмы, которые задаются словом, а читаются числом
+NAMED_VALUES = {
+    'synchronous': {'off': 0, 'normal': 1, 'full': 2, 'extra': 3},
+    'temp_store': {'default': 0, 'file': 1, 'memory': 2},
+}
+
+
+def apply_pragmas(connection):
+    if connection.vendor != 'sqlite':
+        return
+    # Курсор Django здесь не нужен: соединение ещё настраивается.
+    for name, value in settings.SQLITE_PRAGMAS.items():
+        connection.connection.execute(f'PRAGMA {name} = {value}')
+
+
+def active_pragmas(connection):
+    with connection.cursor() as cursor:
+        values = {}
+        for name in settings.SQLITE_PRAGMAS:
+            cursor.execute(f'PRAGMA {name}')
+            row = cursor.fetchone()
+            values[name] = row[0] if row else None
+        return values
+
+
+def normalize(name, value):
+    value = str(value).lower()
+    return str(NAMED_VALUES.get(name, {}).get(value, value))
+
+
+@register(Tags.database)
+def check_pragmas(app_configs=None, **kwargs):
+    messages = []
+    for alias in [DEFAULT_DB_ALIAS, *settings.REPLICA_DATABASES]:
+        connection = connections[alias]
+        if connection.vendor != 'sqlite':
+            continue
+        values = active_pragmas(connection)
+        messages.append(Info(
+            f'SQLite «{alias}»: ' + ', '.join(
+                f'{name}={value}' for name, value in values.items()
+            ),
+            id='posts.I001',
+        ))
+        for name, expected in settings.SQLITE_PRAGMAS.items():
+            if normalize(name, values[name]) != normalize(name, expected):
+                messages.append(Warning(
+                    f'SQLite «{alias}»: {name}={values[name]}, '
+                    f'ожидалось {expected}',
+                    hint='Для базы в памяти часть прагм неприменима.',
+                    id='posts.W001',
+                ))
+    return messages
@@ -0,0 +1,80 @@
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import Comment, Follow, Post, User, UserStats
+
+
+def _count(model, field, ref='user'):
+    rows = model.objects.filter(
+        **{field: OuterRef(ref)}
+    ).order_by().values(field).annotate(count=Count('*')).values('count')
+    return Coalesce(Subquery(rows, output_field=IntegerField()), 0)
+
+
+def recompute(user_ids=None):
+    """Пересчитывает счётчики пачкой: недостающие строки и один UPDATE."""
+    users = User.objects.order_by()
+    if user_ids is not None:
+        users = users.filter(pk__in=user_ids)
+    stats = UserStats.objects.all()
+    if user_ids is not None:
+        stats = stats.filter(user_id__in=user_ids)
+    with transaction.atomic():
+        # Без batch_size: явный размер Django 2.2 не сверяет с пределом
+        # SQLite на число строк в одном INSERT.
+        UserStats.objects.bulk_create(
+            (UserStats(user_id=pk)
+             for pk in users.values_list('pk', flat=True).iterator()),
+            ignore_conflicts=True,
+        )
+        return stats.update(
+            followers_count=_count(Follow, 'author'),
+            following_count=_count(Follow, 'user'),
+            posts_count=_count(Post, 'author'),
+        )
+
+
+def change(user_id, field, delta):
+    """Атомарно сдвигает счётчик; строку без истории пересчитывает."""
+    updated = UserStats.objects.filter(user_id=user_id).update(
+        **{field: Greatest(F(field) + delta, 0)}
+    )
+    # При удалении пользователя его строка может уйти раньше записей,
+    # поэтому создаём её только при росте счётчика.
+    if not updated and delta > 0:
+        recompute([user_id])
+
+
+def get_stats(user):
+    """Счётчики пользователя.
+
+    Строку, загруженную вместе с пользователем, отдаём как есть. Иначе
+    читаем основную базу: пересчёт пишет туда, и реплика о новой строке
+    может ещё не знать.
+    """
+    if User.stats.is_cached(user):
+        try:
+            return user.stats
+        except UserStats.DoesNotExist:
+            pass
+    primary = UserStats.objects.using(DEFAULT_DB_ALIAS)
+    stats = primary.filter(user_id=user.pk).first()
+    if stats is None:
+        recompute([user.pk])
+        stats = primary.get(user_id=user.pk)
+    return stats
+
+
+def recount_comments(post_ids=None):
+    """Сверяет Post.comment_count с таблицей комментариев одним UPDATE."""
+    posts = Post.objects.all()
+    if post_ids is not None:
+        posts = posts.filter(pk__in=post_ids)
+    return posts.update(comment_count=_count(Comment, 'post', ref='pk'))
+
+
+def change_comments(post_id, delta):
+    Post.objects.filter(pk=post_id).update(
+        comment_count=Greatest(F('comment_count') + delta, 0)
+    )
@@ -0,0 +1,49 @@
+import hashlib
+import os
+import tempfile
+
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """Файлы называются по SHA-256 содержимого: одинаковые хранятся раз.
+
+    Хеш считается потоком, пока загрузка пишется во временный файл рядом
+    с целевым каталогом; затем файл атомарно переименовывается, в том
+    числе поверх уже сохранённого такого же содержимого.
+    """
+
+    def get_available_name(self, name, max_length=None):
+        return name
+
+    def _save(self, name, content):
+        directory = os.path.dirname(name)
+        extension = os.path.splitext(name)[1].lower()
+        os.makedirs(self.path(directory), exist_ok=True)
+        digest = hashlib.sha256()
+        descriptor, temporary = tempfile.mkstemp(dir=self.path(directory))
+        try:
+            with os.fdopen(descriptor, 'wb') as destination:
+                if hasattr(content, 'seek'):
+                    content.seek(0)
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    destination.write(chunk)
+            digest = digest.hexdigest()
+            name = os.path.join(directory, digest[:2], digest + extension)
+            # Поверх уже сохранённого: у файла свежее время изменения,
+            # и blobs.collect не удалит его, пока на него не сослались.
+            os.makedirs(os.path.dirname(self.path(name)), exist_ok=True)
+            os.replace(temporary, self.path(name))
+            if self.file_permissions_mode is not None:
+                os.chmod(self.path(name), self.file_permissions_mode)
+        except BaseException:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+            raise
+        return name.replace('\\', '/')
+
+
+content_storage = ContentAddressedStorage()
@@ -0,0 +1,58 @@
+from django import template
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import get_template
+from django.utils.safestring import mark_safe
+
+from posts import feed_cache, thumbnails
+
+register = template.Library()
+
+
+def card_key(post, user, hide_group, full=False, versions=None):
+    viewer = feed_cache.viewer(user, {post.author_id})
+    stamp = int(post.updated.timestamp() * 1000000)
+    if versions is None:
+        versions = feed_cache.card_versions([post])
+    labels = '.'.join(str(versions[scope])
+                      for scope in feed_cache.card_scopes(post))
+    return (f'post-card:{versions[feed_cache.EPOCH_KEY]}:{post.pk}:{stamp}:'
+            f'{post.comment_count}:{labels}:{viewer}:{int(hide_group)}:'
+            f'{int(full)}')
+
+
+def render_cards(posts, user, hide_group=False, full=False):
+    """HTML карточек: готовые берутся из кэша одним get_many."""
+    posts = list(posts)
+    versions = feed_cache.card_versions(posts)
+    keys = [card_key(post, user, hide_group, full, versions)
+            for post in posts]
+    cards = cache.get_many(keys)
+    misses = [(key, post) for key, post in zip(keys, posts)
+              if key not in cards]
+    urls = thumbnails.image_urls(post.image for _, post in misses)
+    missing = {}
+    item = get_template('post_item.html')
+    for key, post in misses:
+        if post.image:
+            post.image_urls = urls[post.image.name]
+        missing[key] = item.render({
+            'post': post,
+            'user': user,
+            'hide_group': hide_group,
+            'full': full,
+        })
+    if missing:
+        cache.set_many(missing, settings.FEED_CACHE_TIMEOUT)
+        cards.update(missing)
+    return mark_safe(''.join(cards[key] for key in keys))
+
+
+@register.simple_tag(takes_context=True)
+def post_cards(context, posts, hide_group=False):
+    return render_cards(posts, context.get('user'), hide_group)
+
+
+@register.simple_tag(takes_context=True)
+def post_card(context, post, hide_group=False, full=False):
+    return render_cards([post], context.get('user'), hide_group, full)
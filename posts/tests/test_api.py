@@ -0,0 +1,76 @@
+import json
+
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post, User
+
+SLUG = 'ramax'
+FEED_URL = reverse('api_feed')
+FOLLOW_FEED_URL = reverse('api_follow_feed')
+
+
+def read(response):
+    return json.loads(b''.join(response.streaming_content))
+
+
+class ApiTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='NikitaF')
+        cls.author = User.objects.create(username='KrisF')
+        cls.reader = User.objects.create(username='Ksu')
+        cls.group = Group.objects.create(title='Ramax Int', slug=SLUG)
+        cls.post = Post.objects.create(text='Ramax Sys, Ramax int',
+                                       author=cls.user, group=cls.group)
+        Follow.objects.create(user=cls.user, author=cls.author)
+
+    def setUp(self):
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def test_api_feed_streams_selected_fields_by_cursor(self):
+        Post.objects.bulk_create(
+            Post(text=f'#{i}', author=self.author) for i in range(25)
+        )
+        with CaptureQueriesContext(connection) as queries:
+            data = read(self.guest_client.get(
+                FEED_URL, {'fields': 'id,author', 'per_page': 10}
+            ))
+        self.assertEqual(set(data['results'][0]), {'id', 'author'})
+        post_query = [q['sql'] for q in queries
+                      if 'FROM "posts_post"' in q['sql']][0]
+        self.assertNotIn('"text"', post_query)
+        seen = [item['id'] for item in data['results']]
+        while data['next']:
+            data = read(self.guest_client.get(
+                FEED_URL,
+                {'fields': 'id', 'per_page': 10, 'cursor': data['next']}
+            ))
+            seen += [item['id'] for item in data['results']]
+        self.assertEqual(seen, list(
+            Post.objects.order_by('-pub_date', '-pk')
+            .values_list('pk', flat=True)
+        ))
+        response = self.guest_client.get(FEED_URL, {'fields': 'password'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_api_post_detail_and_follow_feed(self):
+        Comment.objects.create(post=self.post, author=self.reader, text='!')
+        data = read(self.guest_client.get(
+            reverse('api_post', args=[self.post.id]),
+            {'fields': 'text,group', 'comment_fields': 'author,text'}
+        ))
+        self.assertEqual(data['post'], {'text': self.post.text, 'group': SLUG})
+        self.assertEqual(data['results'], [{'author': 'Ksu', 'text': '!'}])
+        self.assertEqual(
+            self.guest_client.get(FOLLOW_FEED_URL).status_code, 401
+        )
+        Post.objects.create(text='Автор', author=self.author)
+        data = read(self.authorized_client.get(
+            FOLLOW_FEED_URL, {'fields': 'text'}
+        ))
+        self.assertEqual(data['results'], [{'text': 'Автор'}])
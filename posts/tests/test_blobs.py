@@ -0,0 +1,85 @@
+import shutil
+import tempfile
+from datetime import timedelta
+from io import StringIO
+
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from posts import blobs
+from posts.models import ImageBlob, Post, User
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+MEDIA_ROOT = tempfile.mkdtemp()
+NEW_POST_URL = reverse('new_post')
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class ImageBlobTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.storage = Post._meta.get_field('image').storage
+        self.author = User.objects.create(username='NikitaF')
+
+    def upload(self):
+        return self.storage.save('posts/small.gif', ContentFile(SMALL_GIF))
+
+    def test_reupload_during_collect_keeps_file(self):
+        name = self.upload()
+        Post.objects.create(text='Было', author=self.author, image=name)
+        Post.objects.filter(image=name).delete()
+        ImageBlob.objects.filter(name=name).update(
+            updated=timezone.now() - timedelta(hours=2)
+        )
+        # Та же картинка загружается снова, запись ещё не сохранена
+        self.assertEqual(self.upload(), name)
+        self.assertEqual(blobs.collect(), 0)
+        self.assertTrue(self.storage.exists(name))
+        Post.objects.create(text='Стало', author=self.author, image=name)
+        self.assertEqual(ImageBlob.objects.get(name=name).ref_count, 1)
+
+    def test_collect_removes_old_orphans(self):
+        name = self.upload()
+        Post.objects.create(text='Было', author=self.author, image=name)
+        Post.objects.filter(image=name).delete()
+        self.assertEqual(blobs.collect(timedelta(0)), 1)
+        self.assertFalse(self.storage.exists(name))
+        self.assertFalse(ImageBlob.objects.filter(name=name).exists())
+
+    def test_identical_uploads_are_stored_once(self):
+        client = Client()
+        client.force_login(self.author)
+        names = []
+        for text in ('Первая', 'Вторая'):
+            client.post(NEW_POST_URL, {
+                'text': text,
+                'image': SimpleUploadedFile(
+                    name=f'{text}.gif', content=SMALL_GIF,
+                    content_type='image/gif'
+                ),
+            })
+            names.append(Post.objects.get(text=text).image.name)
+        self.assertEqual(names[0], names[1])
+        self.assertTrue(self.storage.exists(names[0]))
+        self.assertEqual(ImageBlob.objects.get(name=names[0]).ref_count, 2)
+        Post.objects.filter(text__in=['Первая', 'Вторая']).delete()
+        self.assertEqual(ImageBlob.objects.get(name=names[0]).ref_count, 0)
+        call_command('collect_image_blobs', grace_minutes=0,
+                     stdout=StringIO())
+        self.assertFalse(ImageBlob.objects.filter(name=names[0]).exists())
+        self.assertFalse(self.storage.exists(names[0]))
@@ -0,0 +1,237 @@
+import multiprocessing
+import os
+import shutil
+import tempfile
+
+from django.apps import apps
+from django.core.cache import cache
+from django.db.models.signals import post_migrate
+from django.test import Client, SimpleTestCase, TestCase
+from django.urls import reverse
+
+from posts import feed_cache
+from posts.caching import TwoTierCache
+from posts.models import Comment, Group, Post, User
+from posts.templatetags.post_cards import card_key
+
+
+class TwoTierCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cache = TwoTierCache(
+            os.path.join(self.directory, 'cache.sqlite3'),
+            {'OPTIONS': {'POLL_INTERVAL': 0, 'LOCAL_MAX_ENTRIES': 2}}
+        )
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def in_other_process(self, action):
+        process = multiprocessing.get_context('fork').Process(target=action)
+        process.start()
+        process.join()
+        self.assertEqual(process.exitcode, 0)
+
+    def test_counters_per_tier(self):
+        self.cache.set('a', 1)
+        self.assertEqual(self.cache.get('a'), 1)
+        self.assertIsNone(self.cache.get('b'))
+        self.assertEqual(self.cache.stats(), {
+            'local': {'hits': 1, 'misses': 1},
+            'shared': {'hits': 0, 'misses': 1},
+        })
+
+    def test_local_tier_is_bounded(self):
+        self.cache.set_many({'a': 1, 'b': 2, 'c': 3})
+        self.assertEqual(self.cache.get_many(['a', 'b', 'c']),
+                         {'a': 1, 'b': 2, 'c': 3})
+        self.assertEqual(self.cache.stats()['shared']['hits'], 1)
+
+    def test_other_processes_invalidate_local_copies(self):
+        self.cache.set('a', 1)
+        self.assertEqual(self.cache.get('a'), 1)
+        self.in_other_process(lambda: self.cache.set('a', 2))
+        self.assertEqual(self.cache.get('a'), 2)
+        self.in_other_process(lambda: self.cache.incr('a'))
+        self.assertEqual(self.cache.get('a'), 3)
+        self.in_other_process(lambda: self.cache.delete('a'))
+        self.assertIsNone(self.cache.get('a'))
+        self.cache.set('b', 1)
+        self.in_other_process(self.cache.clear)
+        self.assertIsNone(self.cache.get('b'))
+
+    def test_add_and_incr_are_shared(self):
+        self.assertTrue(self.cache.add('lock', 1))
+        self.in_other_process(
+            lambda: os._exit(0 if not self.cache.add('lock', 1) else 1)
+        )
+        self.assertEqual(self.cache.incr('lock', 2), 3)
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+
+
+class CacheEpochTests(TestCase):
+    def test_migrate_expires_pages_without_clearing_cache(self):
+        user = User.objects.create(username='NikitaF')
+        post = Post.objects.create(text='Ramax', author=user)
+        cache.set('unrelated', 1)
+        generation = feed_cache.generation(feed_cache.GLOBAL)
+        key = card_key(post, user, False)
+        config = apps.get_app_config('posts')
+        post_migrate.send(sender=config, app_config=config, verbosity=0,
+                          interactive=False, using='default', apps=apps,
+                          plan=[])
+        self.assertEqual(cache.get('unrelated'), 1)
+        self.assertNotEqual(feed_cache.generation(feed_cache.GLOBAL),
+                            generation)
+        self.assertNotEqual(card_key(post, user, False), key)
+
+
+class FeedFragmentTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='NikitaF')
+        cls.group = Group.objects.create(title='Ramax Int', slug='ramax')
+        cls.post = Post.objects.create(text='Было', author=cls.author,
+                                       group=cls.group)
+        cls.readers = [User.objects.create(username=name)
+                       for name in ('KrisF', 'Ksu')]
+
+    def setUp(self):
+        cache.clear()
+
+    def client_for(self, user):
+        client = Client()
+        client.force_login(user)
+        return client
+
+    def test_readers_share_fragments_by_viewer_kind_and_page(self):
+        urls = [reverse('index'),
+                reverse('group_posts', args=[self.group.slug]),
+                reverse('profile', args=[self.author.username])]
+        first, second = (self.client_for(user) for user in self.readers)
+        for url in urls:
+            first.get(url)
+            Client().get(url)
+        # Изменение в обход сигналов: версия ленты прежняя, а ключи
+        # карточек (в них число комментариев) уже новые.
+        Post.objects.filter(pk=self.post.pk).update(text='Стало',
+                                                   comment_count=1)
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertContains(second.get(url, {'utm': 'mail'}), 'Было')
+                self.assertContains(Client().get(url, {'page': 1}), 'Было')
+                self.assertContains(
+                    self.client_for(self.author).get(url), 'Стало'
+                )
+
+    def test_owner_kind_includes_id_on_mixed_feeds(self):
+        other = self.readers[0]
+        post = Post.objects.create(text='Другой', author=other)
+        page = [self.post, post]
+        self.assertEqual(feed_cache.viewer(self.author, {self.author.pk}),
+                         'owner')
+        kinds = [
+            feed_cache.fragment(user, page, before='cursor')['feed_viewer']
+            for user in (self.author, other, self.readers[1])
+        ]
+        self.assertEqual(kinds, [f'owner:{self.author.pk}',
+                                 f'owner:{other.pk}', 'user'])
+
+
+class FeedInvalidationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='NikitaF')
+        cls.reader = User.objects.create(username='Ksu')
+        cls.group = Group.objects.create(title='Ramax Int', slug='ramax')
+        cls.post = Post.objects.create(text='Ramax Sys, Ramax int',
+                                       author=cls.author, group=cls.group)
+        cls.post_url = reverse('post', args=[cls.author.username,
+                                             cls.post.id])
+        cls.edit_url = reverse('post_edit', args=[cls.author.username,
+                                                  cls.post.id])
+
+    def setUp(self):
+        cache.clear()
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def test_feed_cache_is_invalidated_by_new_content(self):
+        urls = [reverse('index'),
+                reverse('group_posts', args=[self.group.slug]),
+                reverse('profile', args=[self.author.username])]
+        for url in urls:
+            self.author_client.get(url)
+        Post.objects.create(text='Хочу подписаться на Р.Киплинга',
+                            author=self.author, group=self.group)
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.author_client.get(url)
+                self.assertContains(response, 'Хочу подписаться')
+        Comment.objects.create(post=self.post, author=self.author, text='!')
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.author_client.get(url)
+                self.assertContains(response, 'Комментариев: 1')
+
+    def test_post_cards_are_cached_per_viewer(self):
+        self.author_client.get(
+            reverse('profile', args=[self.author.username])
+        )
+        self.assertIsNotNone(
+            cache.get(card_key(self.post, self.author, False))
+        )
+        self.assertIsNone(cache.get(card_key(self.post, self.reader, False)))
+        response = self.author_client.get(reverse('index'))
+        self.assertContains(response, self.edit_url)
+        response = self.reader_client.get(reverse('index'))
+        self.assertNotContains(response, self.edit_url)
+
+    def test_cards_follow_author_and_group_changes(self):
+        self.reader_client.get(
+            reverse('profile', args=[self.author.username])
+        )
+        author = User.objects.get(pk=self.author.pk)
+        author.username = 'Renamed'
+        author.save()
+        response = self.reader_client.get(reverse('profile',
+                                                  args=['Renamed']))
+        self.assertContains(response, '@Renamed')
+        self.assertContains(response, reverse('post', args=['Renamed',
+                                                            self.post.id]))
+        self.assertNotContains(response, 'NikitaF')
+        key = card_key(self.post, self.reader, False)
+        Group.objects.get(pk=self.group.pk).save()
+        self.assertNotEqual(card_key(self.post, self.reader, False), key)
+
+    def test_pages_follow_group_and_author_renames(self):
+        index_url = reverse('index')
+        profile_url = reverse('profile', args=[self.author.username])
+        etag = self.reader_client.get(index_url)['ETag']
+        self.reader_client.get(profile_url)
+        group = Group.objects.get(pk=self.group.pk)
+        group.title = 'Новое название'
+        group.save()
+        for url in (index_url, profile_url):
+            with self.subTest(url=url):
+                self.assertContains(self.reader_client.get(url),
+                                    '#Новое название')
+        response = self.reader_client.get(index_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        group_url = reverse('group_posts', args=[self.group.slug])
+        self.reader_client.get(group_url)
+        author = User.objects.get(pk=self.author.pk)
+        author.username = 'Renamed'
+        author.save()
+        for url in (index_url, group_url):
+            with self.subTest(url=url):
+                self.assertContains(self.reader_client.get(url), '@Renamed')
+
+    def test_post_card_changes_after_edit(self):
+        self.author_client.get(self.post_url)
+        self.author_client.post(self.edit_url, {'text': 'Правка'})
+        response = self.author_client.get(self.post_url)
+        self.assertContains(response, 'Правка')
@@ -0,0 +1,63 @@
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Comment, Group, Post, User
+
+USERNAME = 'NikitaF'
+SLUG = 'ramax'
+PROFILE_URL = reverse('profile', args=[USERNAME])
+PROFILE_FOLLOW_URL = reverse('profile_follow', args=[USERNAME])
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username=USERNAME)
+        cls.reader = User.objects.create(username='Ksu')
+        cls.group = Group.objects.create(title='Ramax Int', slug=SLUG)
+        cls.post = Post.objects.create(text='Ramax Sys, Ramax int',
+                                       author=cls.user, group=cls.group)
+
+    def setUp(self):
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def test_feed_pages_answer_304_until_they_change(self):
+        urls = (reverse('index'), reverse('group_posts', args=[SLUG]),
+                PROFILE_URL, reverse('post', args=[USERNAME, self.post.id]))
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.authorized_client.get(url)
+                etag = response['ETag']
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.authorized_client.get(
+                        url, HTTP_IF_NONE_MATCH=etag
+                    )
+                self.assertEqual(response.status_code, 304)
+                self.assertFalse([
+                    query for query in queries
+                    if 'posts_post' in query['sql']
+                ])
+                Comment.objects.create(
+                    post=self.post, author=self.reader, text='!'
+                )
+                response = self.authorized_client.get(
+                    url, HTTP_IF_NONE_MATCH=etag
+                )
+                self.assertEqual(response.status_code, 200)
+
+    def test_follow_changes_profile_validator(self):
+        etag = self.reader_client.get(PROFILE_URL)['ETag']
+        self.reader_client.get(PROFILE_FOLLOW_URL)
+        response = self.reader_client.get(
+            PROFILE_URL, HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(
+            self.guest_client.get(PROFILE_URL)['ETag'], response['ETag']
+        )
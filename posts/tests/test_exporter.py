@@ -0,0 +1,115 @@
+import json
+import os
+import shutil
+import tempfile
+import zipfile
+from io import BytesIO, StringIO
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Group, Post, User
+
+USERNAME = 'NikitaF'
+USERNAME2 = 'Ksu'
+SLUG = 'ramax'
+LOGIN_URL = reverse('login')
+AUTHOR_EXPORT_URL = reverse('export_author', args=[USERNAME])
+GROUP_EXPORT_URL = reverse('export_group', args=[SLUG])
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+class ExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username=USERNAME)
+        cls.user2 = User.objects.create(username=USERNAME2)
+        cls.group = Group.objects.create(title='Ramax Int', slug=SLUG)
+        cls.post = Post.objects.create(text='Ramax Sys, Ramax int',
+                                       author=cls.user, group=cls.group)
+        Comment.objects.create(post=cls.post, author=cls.user2, text='!')
+
+    def setUp(self):
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+        self.authorized_client_2 = Client()
+        self.authorized_client_2.force_login(self.user2)
+
+    def test_author_export_streams_posts_with_comments(self):
+        other = Post.objects.create(
+            text='С картинкой', author=self.user,
+            image=SimpleUploadedFile(name='small.gif', content=SMALL_GIF,
+                                     content_type='image/gif')
+        )
+        response = self.authorized_client.get(AUTHOR_EXPORT_URL)
+        lines = [json.loads(line) for line in
+                 b''.join(response.streaming_content).splitlines()]
+        self.assertEqual(
+            [(line['type'], line.get('id', line.get('post')))
+             for line in lines],
+            [('post', self.post.id), ('comment', self.post.id),
+             ('post', other.id)]
+        )
+        self.assertEqual(lines[2]['image'], other.image.name)
+        self.assertEqual(lines[2]['image_url'], other.image.url)
+
+    def test_exports_are_limited_to_author_and_staff(self):
+        self.assertRedirects(self.guest_client.get(AUTHOR_EXPORT_URL),
+                             f'{LOGIN_URL}?next={AUTHOR_EXPORT_URL}')
+        self.assertEqual(
+            self.authorized_client_2.get(AUTHOR_EXPORT_URL).status_code, 403
+        )
+        self.assertEqual(
+            self.authorized_client.get(GROUP_EXPORT_URL).status_code, 403
+        )
+        User.objects.filter(pk=self.user2.pk).update(is_staff=True)
+        self.assertEqual(
+            self.authorized_client_2.get(AUTHOR_EXPORT_URL).status_code, 200
+        )
+
+    def test_group_export_as_zip(self):
+        User.objects.filter(pk=self.user2.pk).update(is_staff=True)
+        response = self.authorized_client_2.get(GROUP_EXPORT_URL,
+                                                {'format': 'zip'})
+        with zipfile.ZipFile(
+            BytesIO(b''.join(response.streaming_content))
+        ) as archive:
+            posts = archive.read('posts.jsonl').decode().splitlines()
+            comments = archive.read('comments.jsonl').decode().splitlines()
+        self.assertEqual([json.loads(line)['id'] for line in posts],
+                         [self.post.id])
+        self.assertEqual(json.loads(comments[0])['author'], USERNAME2)
+
+    def test_jsonl_export_imports_back(self):
+        Comment.objects.create(post=self.post, author=self.user, text='?')
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, 'export.jsonl')
+        call_command('export_content', '--author', USERNAME,
+                     '--output', path, stdout=StringIO())
+        exported = [
+            (post.id, post.text, [(comment.author_id, comment.text)
+                                  for comment in post.comments.order_by('id')])
+            for post in Post.objects.order_by('id')
+        ]
+        Post.objects.all().delete()
+        for kind, imported in (('posts', 1), ('comments', 2)):
+            out = StringIO()
+            call_command('import_content', kind, path, stdout=out)
+            self.assertIn(f'Готово: {imported} загружено, 0 пропущено',
+                          out.getvalue())
+        self.assertEqual(exported, [
+            (post.id, post.text, [(comment.author_id, comment.text)
+                                  for comment in post.comments.order_by('id')])
+            for post in Post.objects.order_by('id')
+        ])
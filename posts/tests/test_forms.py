@@ -1,8 +1,4 @@
-import shutil
-import tempfile
-
 from django import forms
-from django.conf import settings
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import TestCase, Client
 from django.urls import reverse
@@ -32,7 +28,6 @@ class PostFormsTests(TestCase):
     @classmethod
     def setUpClass(cls):
         super().setUpClass()
-        settings.MEDIA_ROOT = tempfile.mkdtemp(dir=tempfile.gettempdir())
         cls.user = User.objects.create(username=USERNAME)
         cls.group = Group.objects.create(
             title='Ramax Int',
@@ -40,11 +35,6 @@ class PostFormsTests(TestCase):
         )
         cls.form = PostForm()
 
-    @classmethod
-    def tearDownClass(cls):
-        shutil.rmtree(settings.MEDIA_ROOT, ignore_errors=True)
-        super().tearDownClass()
-
     def setUp(self):
         self.guest_client = Client()
         self.authorized_client = Client()
@@ -117,6 +107,17 @@ class PostFormsTests(TestCase):
         self.assertEqual(edited_post.author, self.user)
         self.assertIsNotNone(edited_post.image)
 
+    def test_edit_keeps_comments_added_meanwhile(self):
+        post = Post.objects.get(pk=self.post.pk)
+        Comment.objects.create(post=self.post, author=self.user, text='!')
+        form = PostForm({'text': 'ramax', 'group': self.group.id},
+                        instance=post)
+        self.assertTrue(form.is_valid())
+        form.save()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.text, 'ramax')
+        self.assertEqual(self.post.comment_count, 1)
+
     def test_title_label(self):
         text_label = self.form.fields['text'].label
         self.assertEqual(text_label, 'Текст')
@@ -0,0 +1,79 @@
+import threading
+
+from django.http import HttpResponse
+from django.test import (Client, RequestFactory, SimpleTestCase, TestCase,
+                         override_settings)
+from django.urls import reverse
+
+from posts import metrics
+from posts.models import User
+
+
+class ResolverMatch:
+    view_name = 'threads'
+
+
+def view(request):
+    request.resolver_match = ResolverMatch
+    return HttpResponse(b'ok')
+
+
+class MetricsStoreTests(SimpleTestCase):
+    def test_finished_threads_are_folded_into_totals(self):
+        middleware = metrics.MetricsMiddleware(view)
+        before = metrics.collect().get('threads', metrics.ViewStats())
+        threads = [
+            threading.Thread(
+                target=middleware, args=[RequestFactory().get('/')]
+            )
+            for _ in range(20)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for _ in range(2):
+            stats = metrics.collect()['threads']
+            self.assertEqual(stats.requests - before.requests, 20)
+            self.assertEqual(stats.statuses[200] - before.statuses.get(200, 0),
+                             20)
+        self.assertFalse(set(threads) & set(metrics._stores))
+
+
+class MetricsEndpointTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='NikitaF')
+
+    def test_metrics_endpoint(self):
+        client = Client()
+        client.get(reverse('index'))
+        client.get(reverse('profile', args=[self.user.username]))
+        response = client.get(reverse('metrics'))
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        text = response.content.decode()
+        for line in (
+            'yatube_http_request_duration_seconds_bucket'
+            '{view="index",le="+Inf"} ',
+            'yatube_http_responses_total{view="profile",status="200"} ',
+            'yatube_db_queries_total{view="index"} ',
+            'yatube_template_render_seconds_total{view="profile"} ',
+            'yatube_http_response_size_bytes_count{view="index"} ',
+            'yatube_cache_requests_total{tier="local",result="hit"} ',
+        ):
+            self.assertIn(line, text)
+        response = client.get(reverse('metrics'), REMOTE_ADDR='10.0.0.1')
+        self.assertEqual(response.status_code, 404)
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_token_replaces_address_check(self):
+        client = Client()
+        url = reverse('metrics')
+        self.assertEqual(client.get(url).status_code, 404)
+        self.assertEqual(
+            client.get(url, HTTP_AUTHORIZATION='Bearer wrong').status_code,
+            404
+        )
+        response = client.get(url, HTTP_AUTHORIZATION='Bearer secret',
+                              REMOTE_ADDR='10.0.0.1')
+        self.assertEqual(response.status_code, 200)
@@ -0,0 +1,156 @@
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from posts.models import Comment, Post, User
+from posts.pagination import CursorPaginator
+
+INDEX_URL = reverse('index')
+
+
+class CursorPaginatorTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create(username='NikitaF')
+        now = timezone.now()
+        cls.posts = [
+            Post.objects.create(text=f'Запись {index}', author=author)
+            for index in range(7)
+        ]
+        for index, post in enumerate(cls.posts):
+            post.pub_date = now - timedelta(minutes=index)
+            post.save()
+
+    def setUp(self):
+        self.paginator = CursorPaginator(Post.objects.all(), 3)
+
+    def test_each_page_is_one_query(self):
+        with self.assertNumQueries(1):
+            first = self.paginator.page()
+        self.assertEqual(list(first), self.posts[:3])
+        self.assertFalse(first.has_previous())
+        with self.assertNumQueries(1):
+            second = self.paginator.page(before=first.next_cursor)
+        self.assertEqual(list(second), self.posts[3:6])
+        with self.assertNumQueries(1):
+            last = self.paginator.page(before=second.next_cursor)
+        self.assertEqual(list(last), self.posts[6:])
+        self.assertFalse(last.has_next())
+        with self.assertNumQueries(1):
+            back = self.paginator.page(after=last.previous_cursor)
+        self.assertEqual(list(back), self.posts[3:6])
+        self.assertTrue(back.has_previous())
+        with self.assertNumQueries(1):
+            newest = self.paginator.page(after=back.previous_cursor)
+        self.assertEqual(list(newest), self.posts[:3])
+        self.assertFalse(newest.has_previous())
+
+    def test_full_last_page_has_no_next(self):
+        paginator = CursorPaginator(Post.objects.all(), 7)
+        with self.assertNumQueries(1):
+            page = paginator.page()
+        self.assertEqual(len(page), 7)
+        self.assertFalse(page.has_next())
+
+    def test_object_list_is_loaded_queryset(self):
+        first = self.paginator.page()
+        back = self.paginator.page(after=self.paginator.page(
+            before=first.next_cursor
+        ).previous_cursor)
+        for page in (first, back):
+            with self.subTest(page=page):
+                with self.assertNumQueries(0):
+                    self.assertEqual(list(page.object_list), self.posts[:3])
+                    self.assertEqual(page.object_list.count(), 3)
+
+
+class CursorPageViewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='KrisF')
+        cls.reader = User.objects.create(username='Ksu')
+
+    def setUp(self):
+        self.guest_client = Client()
+
+    def test_index_cursor_pagination_walks_whole_feed(self):
+        Post.objects.bulk_create(
+            Post(text=f'Запись {i}', author=self.author)
+            for i in range(25)
+        )
+        expected = list(Post.objects.order_by('-pub_date', '-id'))
+        response = self.guest_client.get(INDEX_URL)
+        seen = list(response.context['page'])
+        cursor = response.context['pager'].next_cursor
+        pages = []
+        while cursor:
+            response = self.guest_client.get(INDEX_URL, {'before': cursor})
+            page = response.context['page']
+            pages.append(page)
+            seen.extend(page)
+            cursor = page.next_cursor
+        self.assertEqual(seen, expected)
+        response = self.guest_client.get(
+            INDEX_URL, {'after': pages[-1].previous_cursor}
+        )
+        self.assertEqual(list(response.context['page']),
+                         list(pages[-2]))
+
+    def test_index_first_page_reads_no_count(self):
+        Post.objects.bulk_create(
+            Post(text=f'Запись {i}', author=self.author)
+            for i in range(15)
+        )
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.guest_client.get(INDEX_URL)
+        self.assertFalse([query for query in queries
+                          if 'COUNT(' in query['sql']])
+        self.assertEqual(
+            list(response.context['page']),
+            list(Post.objects.order_by('-pub_date', '-id')[:10])
+        )
+        self.assertContains(
+            response, f'?before={response.context["pager"].next_cursor}'
+        )
+
+    def test_index_page_number_fallback(self):
+        Post.objects.bulk_create(
+            Post(text=f'Запись {i}', author=self.author)
+            for i in range(15)
+        )
+        response = self.guest_client.get(INDEX_URL, {'page': 2})
+        self.assertEqual(response.context['page'].number, 2)
+        self.assertEqual(len(response.context['page']), 5)
+
+    def test_post_comments_are_paginated_by_cursor(self):
+        post = Post.objects.create(text='Обсуждение', author=self.author)
+        Comment.objects.bulk_create(
+            Comment(post=post, author=self.reader, text=f'#{i}')
+            for i in range(45)
+        )
+        expected = list(
+            post.comments.order_by('-created', '-id')
+            .values_list('text', flat=True)
+        )
+        response = self.guest_client.get(
+            reverse('post', args=[self.author.username, post.id])
+        )
+        self.assertEqual(len(response.context['comments']), 20)
+        page = response.context['comments_page']
+        seen = [comment.text for comment in page]
+        comments_url = reverse('post_comments',
+                               args=[self.author.username, post.id])
+        cursor = page.next_cursor
+        while cursor:
+            data = self.guest_client.get(
+                comments_url, {'before': cursor}
+            ).json()
+            seen.extend(comment['text'] for comment in data['comments'])
+            cursor = data['next']
+        self.assertEqual(seen, expected)
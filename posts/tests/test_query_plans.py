@@ -0,0 +1,178 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts import timeline
+from posts.models import Comment, Follow, Group, Post, User
+
+USERNAME = 'NikitaF'
+AUTHOR = 'KrisF'
+SLUG = 'ramax'
+
+
+class QueryPlanTests(TestCase):
+    """Основные запросы представлений должны идти по индексам."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username=USERNAME)
+        cls.author = User.objects.create(username=AUTHOR)
+        cls.group = Group.objects.create(title='Ramax Int', slug=SLUG)
+        cls.post = Post.objects.create(
+            text='Ramax Sys, Ramax int',
+            author=cls.author,
+            group=cls.group
+        )
+        Comment.objects.create(post=cls.post, author=cls.user, text='!')
+        Follow.objects.create(user=cls.user, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def plan_for(self, url, table):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+            if response.streaming:
+                b''.join(response.streaming_content)
+        main = [
+            query['sql'] for query in queries
+            if query['sql'].startswith('SELECT')
+            and f'FROM "{table}"' in query['sql']
+            and 'COUNT(' not in query['sql']
+        ]
+        self.assertTrue(main, f'Нет запроса к {table} на {url}')
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {main[-1]}')
+            return ' | '.join(row[-1] for row in cursor.fetchall())
+
+    def test_views_read_through_indexes(self):
+        cases = {
+            reverse('index'): ('posts_post', 'post_pub_date_id_idx'),
+            reverse('group_posts', args=[SLUG]): (
+                'posts_post', 'post_group_pub_date_idx'),
+            reverse('profile', args=[AUTHOR]): (
+                'posts_post', 'post_author_pub_date_idx'),
+            reverse('post', args=[AUTHOR, self.post.id]): (
+                'posts_comment', 'comment_post_created_idx'),
+            reverse('follow_index'): (
+                'posts_post', 'timeline_user_pub_date_idx'),
+        }
+        for url, (table, index) in cases.items():
+            with self.subTest(url=url):
+                plan = self.plan_for(url, table)
+                self.assertIn(index, plan)
+                self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_follow_cursor_pages_read_timeline_index(self):
+        cursor = timeline.cursors(
+            Post.objects.all(), self.user, 10
+        ).encode(self.post)
+        for url in (f'{reverse("follow_index")}?before={cursor}',
+                    f'{reverse("api_follow_feed")}?cursor={cursor}'):
+            with self.subTest(url=url):
+                plan = self.plan_for(url, 'posts_post')
+                self.assertIn('timeline_user_pub_date_idx', plan)
+                self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_follow_check_uses_unique_index(self):
+        plan = self.plan_for(reverse('profile', args=[AUTHOR]),
+                             'posts_follow')
+        self.assertIn('INDEX', plan)
+        self.assertNotIn('SCAN', plan)
+
+    def test_admin_changelists_avoid_full_counts_and_like(self):
+        admin = User.objects.create_superuser('admin', 'a@a.ru', 'pass')
+        self.client.force_login(admin)
+        for model in ('post', 'comment', 'follow'):
+            url = reverse(f'admin:posts_{model}_changelist')
+            with self.subTest(model=model):
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertFalse([
+                    query['sql'] for query in queries
+                    if 'COUNT(' in query['sql']
+                    and 'LIMIT 10000' not in query['sql']
+                ])
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                reverse('admin:posts_post_changelist'), {'q': 'sys'}
+            )
+        self.assertEqual(list(response.context['cl'].result_list),
+                         [self.post])
+        self.assertFalse([
+            query['sql'] for query in queries if ' LIKE ' in query['sql']
+        ])
+        response = self.client.get(
+            reverse('admin:posts_comment_changelist'), {'q': USERNAME}
+        )
+        self.assertEqual(len(response.context['cl'].result_list), 1)
+
+    def test_admin_punctuation_search_and_count_after_deletes(self):
+        admin = User.objects.create_superuser('admin', 'a@a.ru', 'pass')
+        self.client.force_login(admin)
+        url = reverse('admin:posts_post_changelist')
+        response = self.client.get(url, {'q': '!!'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(response.context['cl'].result_list), [])
+        response = self.client.get(
+            reverse('admin:posts_comment_changelist'), {'q': '?'}
+        )
+        self.assertEqual(response.status_code, 200)
+        posts = [Post.objects.create(text=f'Запись {index}',
+                                     author=self.author)
+                 for index in range(5)]
+        Post.objects.filter(pk__in=[post.pk for post in posts[:4]]).delete()
+        response = self.client.get(url)
+        self.assertEqual(response.context['cl'].result_count, 2)
+
+
+class QueryCountTests(TestCase):
+    """Число запросов страницы не зависит от числа записей на ней."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username=USERNAME)
+        cls.author = User.objects.create(username=AUTHOR)
+        cls.group = Group.objects.create(title='Ramax Int', slug=SLUG)
+        cls.post = Post.objects.create(text='Ramax Sys, Ramax int',
+                                       author=cls.user, group=cls.group)
+        Comment.objects.create(post=cls.post, author=cls.author, text='!')
+        Follow.objects.create(user=cls.author, author=cls.user)
+
+    def setUp(self):
+        self.user_client = Client()
+        self.user_client.force_login(self.user)
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+
+    def test_feed_query_count_does_not_depend_on_page_size(self):
+        urls = {
+            reverse('index'): self.user_client,
+            reverse('group_posts', args=[SLUG]): self.user_client,
+            reverse('profile', args=[USERNAME]): self.user_client,
+            reverse('post', args=[USERNAME, self.post.id]): self.user_client,
+            reverse('follow_index'): self.author_client,
+        }
+        counts = {}
+        for url, client in urls.items():
+            cache.clear()
+            with CaptureQueriesContext(connection) as queries:
+                client.get(url)
+            counts[url] = len(queries)
+        for i in range(9):
+            post = Post.objects.create(
+                text=f'Запись {i}', author=self.user, group=self.group
+            )
+            Comment.objects.create(post=post, author=self.author, text='!')
+            Comment.objects.create(post=self.post, author=self.user, text='?')
+        for url, client in urls.items():
+            with self.subTest(url=url):
+                cache.clear()
+                with CaptureQueriesContext(connection) as queries:
+                    client.get(url)
+                self.assertEqual(len(queries), counts[url])
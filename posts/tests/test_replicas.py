@@ -0,0 +1,130 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+
+from django.core.cache import cache
+from django.db import connections, router
+from django.test import Client, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts import replicas
+from posts.models import Post, User, UserStats
+from posts.stats import get_stats
+
+USERNAME = 'NikitaF'
+
+
+@override_settings(REPLICA_DATABASES=['replica'])
+class ReplicaRoutingTests(TransactionTestCase):
+    # Зеркало в тестах — отдельное соединение: данные должны быть
+    # зафиксированы, иначе чтение с него упрётся в блокировку.
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        self.user = User.objects.create(username=USERNAME)
+        self.post = Post.objects.create(text='Ramax', author=self.user)
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def queries(self, method, url, data=None):
+        with CaptureQueriesContext(connections['default']) as primary, \
+                CaptureQueriesContext(connections['replica']) as replica:
+            getattr(self.client, method)(url, data)
+        return (
+            [q['sql'] for q in primary if 'posts_post' in q['sql']],
+            [q['sql'] for q in replica if 'posts_post' in q['sql']],
+        )
+
+    def test_read_views_use_replica(self):
+        urls = [
+            reverse('index'),
+            reverse('profile', args=[USERNAME]),
+            reverse('post', args=[USERNAME, self.post.id]),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                primary, replica = self.queries('get', url)
+                self.assertTrue(replica)
+                self.assertFalse(primary)
+
+    def test_sessions_and_users_are_read_from_primary(self):
+        with CaptureQueriesContext(connections['replica']) as replica:
+            response = self.client.get(reverse('index'))
+        self.assertTrue(response.context['user'].is_authenticated)
+        self.assertNotIn('sessionid', response.cookies)
+        for table in ('django_session', 'auth_user"', 'django_content'):
+            self.assertFalse([q for q in replica
+                              if f'FROM "{table}' in q['sql']], table)
+        with replicas.reading_from_replica():
+            self.assertEqual(router.db_for_read(User), 'default')
+            self.assertEqual(router.db_for_read(Post), 'replica')
+
+    def test_missing_stats_are_recomputed_on_primary(self):
+        UserStats.objects.filter(user=self.user).delete()
+        with CaptureQueriesContext(connections['replica']) as replica, \
+                replicas.reading_from_replica():
+            stats = get_stats(User.objects.get(pk=self.user.pk))
+        self.assertEqual(stats.posts_count, 1)
+        self.assertFalse([q for q in replica
+                          if 'posts_userstats' in q['sql']])
+
+    def test_primary_is_pinned_after_write(self):
+        primary, replica = self.queries(
+            'post', reverse('new_post'), {'text': 'Новая'}
+        )
+        self.assertTrue(primary)
+        self.assertFalse(replica)
+        self.assertIn(replicas.PIN_COOKIE, self.client.cookies)
+        primary, replica = self.queries('get', reverse('index'))
+        self.assertTrue(primary)
+        self.assertFalse(replica)
+
+
+class ReplicaSyncTests(TransactionTestCase):
+    # backup API ждёт, пока у источника открыта транзакция.
+    def setUp(self):
+        cache.clear()
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        self.target = os.path.join(directory, 'replica.sqlite3')
+
+    def lagging_replica(self):
+        """Реплика в отдельном файле: её данные меняет только sync."""
+        connections.databases['lagging'] = {
+            'ENGINE': 'django.db.backends.sqlite3', 'NAME': self.target,
+        }
+        self.addCleanup(connections.databases.pop, 'lagging')
+        self.addCleanup(lambda: connections['lagging'].close())
+        return override_settings(REPLICA_DATABASES=['lagging'])
+
+    def test_sync_copies_primary(self):
+        Post.objects.create(
+            text='Ramax', author=User.objects.create(username=USERNAME)
+        )
+        replicas.sync(self.target)
+        copy = sqlite3.connect(self.target)
+        try:
+            self.assertEqual(
+                copy.execute('SELECT text FROM posts_post').fetchall(),
+                [('Ramax',)]
+            )
+        finally:
+            copy.close()
+
+    def test_pages_built_from_lagging_replica_expire_after_sync(self):
+        author = User.objects.create(username=USERNAME)
+        replicas.sync(self.target)
+        Post.objects.create(text='Новая запись', author=author)
+        client = Client()
+        with self.lagging_replica():
+            response = client.get(reverse('index'))
+            self.assertNotContains(response, 'Новая запись')
+            etag = response['ETag']
+            replicas.sync(self.target)
+            self.assertContains(client.get(reverse('index')), 'Новая запись')
+            response = client.get(reverse('index'),
+                                  HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 200)
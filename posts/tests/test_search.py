@@ -0,0 +1,61 @@
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Post, User
+
+SEARCH_URL = reverse('search')
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='KrisF')
+        cls.reader = User.objects.create(username='Ksu')
+
+    def setUp(self):
+        self.guest_client = Client()
+
+    def test_search_ranks_highlights_and_pages(self):
+        Post.objects.bulk_create(
+            Post(text=f'Кактус номер {i} <b>', author=self.author)
+            for i in range(15)
+        )
+        Post.objects.create(text='Ёжик и кактус', author=self.author)
+        response = self.guest_client.get(SEARCH_URL, {'q': 'кактус'})
+        results = response.context['results']
+        self.assertEqual(len(results), 10)
+        self.assertContains(response, '<mark>Кактус</mark>')
+        self.assertContains(response, '&lt;b&gt;')
+        seen = [post.id for post, _ in results]
+        cursor = response.context['next_cursor']
+        response = self.guest_client.get(
+            SEARCH_URL, {'q': 'кактус', 'after': cursor}
+        )
+        seen += [post.id for post, _ in response.context['results']]
+        self.assertIsNone(response.context['next_cursor'])
+        self.assertEqual(len(seen), 16)
+        self.assertEqual(len(set(seen)), 16)
+        response = self.guest_client.get(SEARCH_URL, {'q': 'ЁЖИК'})
+        self.assertEqual(len(response.context['results']), 1)
+
+    def test_search_follows_edits_and_comments(self):
+        post = Post.objects.create(text='Ramax Sys, Ramax int',
+                                   author=self.author)
+        post.text = 'Совсем другой текст'
+        post.save()
+        response = self.guest_client.get(SEARCH_URL, {'q': 'Ramax'})
+        self.assertEqual(response.context['results'], [])
+        comment = Comment.objects.create(
+            post=post, author=self.reader, text='Ramax навсегда'
+        )
+        response = self.guest_client.get(
+            SEARCH_URL, {'q': 'ramax', 'scope': 'comments'}
+        )
+        self.assertEqual(
+            [item for item, _ in response.context['results']], [comment]
+        )
+        comment.delete()
+        response = self.guest_client.get(
+            SEARCH_URL, {'q': 'ramax', 'scope': 'comments'}
+        )
+        self.assertEqual(response.context['results'], [])
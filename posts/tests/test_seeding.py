@@ -0,0 +1,32 @@
+import json
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from posts.models import Comment, Post, TimelineEntry
+
+
+class SeedingTests(TestCase):
+    def test_seed_data_and_benchmark_views(self):
+        call_command('seed_data', users=20, groups=3, posts=60,
+                     comments=150, follows=5, seed=1, stdout=StringIO())
+        posts = Post.objects.filter(author__username__startswith='seed')
+        self.assertEqual(posts.count(), 60)
+        self.assertEqual(
+            Comment.objects.filter(post__in=posts).count(), 150
+        )
+        self.assertTrue(TimelineEntry.objects.filter(
+            user__username__startswith='seed'
+        ).exists())
+        out = StringIO()
+        call_command('benchmark_views', requests=3, warmup=0, json=True,
+                     stdout=out)
+        report = json.loads(out.getvalue())['views']
+        self.assertEqual(set(report), {
+            'index', 'group_posts', 'profile', 'post_view', 'follow_index'
+        })
+        for row in report.values():
+            self.assertEqual(row['statuses'], [200])
+            self.assertLessEqual(row['p50_ms'], row['p99_ms'])
+            self.assertGreater(row['bytes'], 0)
@@ -0,0 +1,31 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+
+from posts import sqlite
+
+
+class SqlitePragmaTests(TestCase):
+    def test_pragmas_are_applied_to_connection(self):
+        values = sqlite.active_pragmas(connection)
+        self.assertEqual(values['busy_timeout'], 5000)
+        self.assertEqual(values['cache_size'], -64 * 1024)
+        self.assertEqual(values['synchronous'], 1)
+
+    @override_settings(SQLITE_PRAGMAS={'busy_timeout': 1234})
+    def test_check_reports_mismatched_pragmas(self):
+        messages = sqlite.check_pragmas()
+        self.assertEqual(
+            [message.id for message in messages],
+            ['posts.I001', 'posts.W001']
+        )
+        self.assertIn('busy_timeout=5000', messages[0].msg)
+
+
+class SqliteMaintenanceTests(TransactionTestCase):
+    def test_maintenance_command(self):
+        out = StringIO()
+        call_command('sqlite_maintenance', '--analyze', stdout=out)
+        self.assertIn('Контрольная точка', out.getvalue())
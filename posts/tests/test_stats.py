@@ -0,0 +1,85 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Post, User, UserStats
+from posts.stats import recompute
+
+AUTHOR_PROFILE_URL = reverse('profile', args=['KrisF'])
+AUTHOR_FOLLOW_URL = reverse('profile_follow', args=['KrisF'])
+AUTHOR_UNFOLLOW_URL = reverse('profile_unfollow', args=['KrisF'])
+
+
+class UserStatsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='NikitaF')
+        cls.author = User.objects.create(username='KrisF')
+        cls.reader = User.objects.create(username='Ksu')
+        Follow.objects.create(user=cls.user, author=cls.author)
+        Post.objects.create(text='Ramax Sys, Ramax int', author=cls.user)
+
+    def test_profile_counters_follow_writes(self):
+        reader_client = Client()
+        reader_client.force_login(self.reader)
+        reader_client.get(AUTHOR_FOLLOW_URL)
+        Post.objects.create(text='Ещё одна', author=self.author)
+        response = reader_client.get(AUTHOR_PROFILE_URL)
+        stats = response.context['stats']
+        self.assertEqual(
+            (stats.followers_count, stats.following_count, stats.posts_count),
+            (2, 0, 1)
+        )
+        reader_client.get(AUTHOR_UNFOLLOW_URL)
+        self.author.posts.all().delete()
+        stats.refresh_from_db()
+        self.assertEqual((stats.followers_count, stats.posts_count), (1, 0))
+
+    def test_repair_user_stats_command(self):
+        UserStats.objects.all().delete()
+        call_command('repair_user_stats', stdout=StringIO())
+        self.assertEqual(UserStats.objects.count(), User.objects.count())
+        stats = UserStats.objects.get(user=self.user)
+        self.assertEqual(
+            (stats.followers_count, stats.following_count, stats.posts_count),
+            (0, 1, 1)
+        )
+
+    def test_recompute_inserts_more_rows_than_one_sqlite_insert(self):
+        User.objects.bulk_create(
+            User(username=f'user{index}') for index in range(600)
+        )
+        users = list(User.objects.filter(username__startswith='user')
+                     .order_by('pk'))
+        Follow.objects.bulk_create(
+            Follow(user=user, author=users[0]) for user in users[1:]
+        )
+        UserStats.objects.all().delete()
+        self.assertEqual(recompute(), 603)
+        self.assertEqual(
+            UserStats.objects.get(user=users[0]).followers_count, 599
+        )
+
+
+class CommentCountTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='NikitaF')
+        cls.reader = User.objects.create(username='Ksu')
+        cls.post = Post.objects.create(text='Ramax Sys, Ramax int',
+                                       author=cls.author)
+
+    def test_comment_count_is_stored_on_write(self):
+        comment = Comment.objects.create(
+            post=self.post, author=self.reader, text='!'
+        )
+        Comment.objects.create(post=self.post, author=self.author, text='?')
+        comment.delete()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 1)
+        Post.objects.filter(pk=self.post.pk).update(comment_count=7)
+        call_command('reconcile_comment_counts', stdout=StringIO())
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 1)
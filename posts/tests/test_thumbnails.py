@@ -0,0 +1,142 @@
+import shutil
+import tempfile
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from sorl.thumbnail import get_thumbnail
+from sorl.thumbnail.conf import settings as sorl_settings
+
+from posts import thumbnails, webp
+from posts.importer import Importer
+from posts.models import Post, User
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+MEDIA_ROOT = tempfile.mkdtemp()
+INDEX_URL = reverse('index')
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class ThumbnailTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='NikitaF')
+
+    def setUp(self):
+        cache.clear()
+        storage = Post._meta.get_field('image').storage
+        self.name = storage.save('posts/small.gif', ContentFile(SMALL_GIF))
+
+    def test_card_file_name_matches_sorl(self):
+        thumbnail = get_thumbnail(thumbnails.source_file(self.name),
+                                  thumbnails.CARD_GEOMETRY,
+                                  **thumbnails.CARD_OPTIONS)
+        self.assertEqual(thumbnails.card_thumbnail_file(self.name).name,
+                         thumbnail.name)
+
+    def test_other_kvstores_use_public_api(self):
+        url = thumbnails.generate(self.name)
+        self.addCleanup(setattr, sorl_settings, 'THUMBNAIL_CACHE',
+                        sorl_settings.THUMBNAIL_CACHE)
+        # Настройки sorl читаются один раз, override_settings их не меняет
+        sorl_settings.THUMBNAIL_CACHE = 'thumbnails'
+        cache.delete(thumbnails.url_key(self.name))
+        image = Post(image=self.name).image
+        self.assertEqual(thumbnails.card_url(image), url)
+
+    def test_webp_variant_names_keep_source_extension(self):
+        names = {webp.variant_name(f'posts/a.{extension}', webp.CARD)
+                 for extension in ('jpg', 'png')}
+        self.assertEqual(names, {'posts/webp/a.jpg-card.webp',
+                                 'posts/webp/a.png-card.webp'})
+
+    def test_missing_thumbnail_and_webp_are_cached(self):
+        image = Post(image=self.name).image
+        with self.assertNumQueries(1):
+            self.assertEqual(thumbnails.card_url(image), image.url)
+        with self.assertNumQueries(0):
+            self.assertEqual(thumbnails.card_url(image), image.url)
+        url = thumbnails.generate(self.name)
+        self.assertEqual(thumbnails.card_url(image), url)
+        cache.delete(thumbnails.webp_key(self.name))
+        for variant in (webp.CARD, webp.FULL):
+            default_storage.delete(webp.variant_name(self.name, variant))
+        with mock.patch.object(default_storage, 'exists',
+                               wraps=default_storage.exists) as exists:
+            for _ in range(2):
+                urls = thumbnails.image_urls([image])[self.name]
+                self.assertIsNone(urls['card_webp'])
+        self.assertEqual(exists.call_count, 1)
+
+    def test_card_thumbnail_is_resolved_after_generation(self):
+        post = Post.objects.create(text='С картинкой', author=self.author,
+                                   image=self.name)
+        self.assertEqual(thumbnails.card_url(post.image), post.image.url)
+        url = thumbnails.generate(self.name)
+        self.assertNotEqual(url, post.image.url)
+        cache.clear()
+        self.assertEqual(thumbnails.card_url(post.image), url)
+        self.assertContains(Client().get(INDEX_URL), url)
+
+    def test_card_thumbnails_are_resolved_in_one_batch(self):
+        storage = Post._meta.get_field('image').storage
+        images = []
+        for i in range(3):
+            name = storage.save(f'posts/small{i}.gif', ContentFile(
+                SMALL_GIF[:13] + bytes([i, i, i]) + SMALL_GIF[16:]
+            ))
+            thumbnails.generate(name)
+            images.append(Post(image=name).image)
+        cache.clear()
+        with self.assertNumQueries(1):
+            urls = thumbnails.image_urls(images)
+        with self.assertNumQueries(0):
+            self.assertEqual(thumbnails.image_urls(images), urls)
+        self.assertEqual(
+            len({image_urls['card'] for image_urls in urls.values()}), 3
+        )
+
+    def test_webp_variants_are_served_with_fallback(self):
+        post = Post.objects.create(text='С картинкой', author=self.author,
+                                   image=self.name)
+        thumbnails.generate(self.name)
+        urls = thumbnails.image_urls([post.image])[self.name]
+        self.assertTrue(urls['card_webp'].endswith('-card.webp'))
+        self.assertTrue(urls['full_webp'].endswith('-full.webp'))
+        client = Client()
+        response = client.get(INDEX_URL)
+        self.assertContains(response, urls['card_webp'])
+        self.assertContains(response, urls['card'])
+        response = client.get(
+            reverse('post', args=[self.author.username, post.id])
+        )
+        self.assertContains(response, urls['full_webp'])
+        self.assertContains(response, urls['original'])
+
+    def test_generation_is_scheduled_for_any_new_image(self):
+        with mock.patch.object(thumbnails, 'schedule') as schedule:
+            post = Post.objects.create(text='Из shell', author=self.author,
+                                       image=self.name)
+            post.text = 'Без новой картинки'
+            post.save()
+            Importer('posts').run([{'text': 'Импорт', 'author': 'NikitaF',
+                                    'image': 'posts/imported.gif'}])
+        self.assertEqual(
+            [call.args for call in schedule.call_args_list],
+            [(self.name,), ('posts/imported.gif',)]
+        )
@@ -0,0 +1,113 @@
+import json
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts import timeline
+from posts.models import Follow, Post, TimelineEntry, User
+
+FOLLOW_URL = reverse('follow_index')
+API_FOLLOW_URL = reverse('api_follow_feed')
+FOLLOW_AUTHOR_URL = reverse('profile_follow', args=['KrisF'])
+UNFOLLOW_AUTHOR_URL = reverse('profile_unfollow', args=['KrisF'])
+
+
+class TimelineTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='NikitaF')
+        cls.author = User.objects.create(username='KrisF')
+        cls.other = User.objects.create(username='Ksu')
+        Follow.objects.create(user=cls.user, author=cls.author)
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def test_fan_out_reaches_more_followers_than_one_insert(self):
+        User.objects.bulk_create(
+            User(username=f'reader{index}') for index in range(600)
+        )
+        Follow.objects.bulk_create(
+            Follow(user=user, author=self.author)
+            for user in User.objects.filter(username__startswith='reader')
+        )
+        post = Post.objects.create(text='Всем', author=self.author)
+        self.assertEqual(
+            TimelineEntry.objects.filter(post=post).count(), 601
+        )
+
+    def test_follow_feed_walks_by_cursor(self):
+        Post.objects.bulk_create(
+            Post(text=f'Запись {index}', author=author)
+            for index in range(25) for author in (self.author, self.other)
+        )
+        timeline.fill(user_ids=[self.user.pk])
+        expected = list(self.author.posts.order_by('-pub_date', '-pk'))
+        response = self.client.get(FOLLOW_URL)
+        seen = list(response.context['page'])
+        cursor = response.context['pager'].next_cursor
+        pages = []
+        while cursor:
+            response = self.client.get(FOLLOW_URL, {'before': cursor})
+            page = response.context['page']
+            pages.append(page)
+            seen.extend(page)
+            cursor = page.next_cursor
+        self.assertEqual(seen, expected)
+        response = self.client.get(
+            FOLLOW_URL, {'after': pages[-1].previous_cursor}
+        )
+        self.assertEqual(list(response.context['page']), list(pages[-2]))
+        seen = []
+        params = {'fields': 'id', 'per_page': 10}
+        while True:
+            data = json.loads(b''.join(
+                self.client.get(API_FOLLOW_URL, params).streaming_content
+            ))
+            seen += [item['id'] for item in data['results']]
+            if not data['next']:
+                break
+            params['cursor'] = data['next']
+        self.assertEqual(seen, [post.pk for post in expected])
+
+    def test_first_follow_page_reads_no_count(self):
+        Post.objects.bulk_create(
+            Post(text=f'Запись {index}', author=self.author)
+            for index in range(15)
+        )
+        timeline.fill(user_ids=[self.user.pk])
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(FOLLOW_URL)
+        self.assertFalse([query for query in queries
+                          if 'COUNT(' in query['sql']])
+        self.assertEqual(
+            list(response.context['page']),
+            list(self.author.posts.order_by('-pub_date', '-pk')[:10])
+        )
+        self.assertContains(
+            response, f'?before={response.context["pager"].next_cursor}'
+        )
+
+    def test_timeline_follows_subscriptions(self):
+        post = Post.objects.create(text='В ленту', author=self.author)
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.user, post=post).exists())
+        self.client.get(UNFOLLOW_AUTHOR_URL)
+        self.assertFalse(TimelineEntry.objects.filter(user=self.user).exists())
+        self.client.get(FOLLOW_AUTHOR_URL)
+        response = self.client.get(FOLLOW_URL)
+        self.assertEqual(list(response.context['page']), [post])
+
+    def test_rebuild_timelines_command(self):
+        post = Post.objects.create(text='В ленту', author=self.author)
+        TimelineEntry.objects.all().delete()
+        call_command('rebuild_timelines', stdout=StringIO())
+        self.assertEqual(
+            list(TimelineEntry.objects.values_list('user', 'post')),
+            [(self.user.id, post.id)]
+        )
@@ -0,0 +1,90 @@
+from django.db import connection, transaction
+from django.db.models import Q
+
+from .models import Follow, Post, TimelineEntry
+from .pagination import CursorPaginator
+
+# Сколько id передаётся в одном IN (...)
+ID_CHUNK = 500
+# Колонки ленты с теми же значениями, что (pub_date, id) записи
+KEYS = ('timeline_entries__pub_date', 'timeline_entries__post__id')
+
+
+def _insert(cursor, condition, params):
+    """INSERT ... SELECT записей авторов в ленты их подписчиков."""
+    cursor.execute(
+        f'INSERT OR IGNORE INTO {TimelineEntry._meta.db_table} '
+        f'(user_id, post_id, pub_date) '
+        f'SELECT f.user_id, p.id, p.pub_date '
+        f'FROM {Follow._meta.db_table} f '
+        f'JOIN {Post._meta.db_table} p ON p.author_id = f.author_id '
+        f'WHERE {condition}',
+        params
+    )
+    return cursor.rowcount
+
+
+def fan_out(post):
+    """Раскладывает новую запись по лентам всех подписчиков автора."""
+    with connection.cursor() as cursor:
+        return _insert(cursor, 'p.id = %s', [post.id])
+
+
+def backfill(user_id, author_id):
+    """Добавляет в ленту подписчика уже опубликованные записи автора."""
+    with connection.cursor() as cursor:
+        return _insert(cursor, 'f.user_id = %s AND f.author_id = %s',
+                       [user_id, author_id])
+
+
+def cursors(queryset, user, per_page):
+    """Курсорная пагинация записей ``queryset`` из ленты ``user``.
+
+    Ключ — (pub_date, post) самой ленты: страница читается диапазоном
+    индекса (user, pub_date, post) без сортировки записей.
+    """
+    return CursorPaginator(queryset, per_page, keys=KEYS,
+                           scope=Q(timeline_entries__user=user))
+
+
+def prune(user_id, author_id):
+    """Убирает из ленты записи автора, от которого пользователь отписался."""
+    TimelineEntry.objects.filter(
+        user_id=user_id,
+        post__author_id=author_id
+    ).delete()
+
+
+def fill(author_ids=(), user_ids=()):
+    """Дописывает недостающее в ленты одним INSERT ... SELECT на пачку id.
+
+    Раскладываются записи авторов ``author_ids`` и всё, что положено
+    подписчикам ``user_ids``; уже разложенное не трогается.
+    """
+    inserted = 0
+    with transaction.atomic(), connection.cursor() as cursor:
+        for column, ids in (('p.author_id', list(author_ids)),
+                            ('f.user_id', list(user_ids))):
+            for start in range(0, len(ids), ID_CHUNK):
+                chunk = ids[start:start + ID_CHUNK]
+                inserted += _insert(
+                    cursor,
+                    f'{column} IN ({", ".join(["%s"] * len(chunk))})',
+                    chunk
+                )
+    return inserted
+
+
+def rebuild():
+    """Пересобирает все ленты одним INSERT ... SELECT."""
+    timeline = TimelineEntry._meta.db_table
+    follow = Follow._meta.db_table
+    post = Post._meta.db_table
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {timeline}')
+        cursor.execute(
+            f'INSERT INTO {timeline} (user_id, post_id, pub_date) '
+            f'SELECT DISTINCT f.user_id, p.id, p.pub_date '
+            f'FROM {follow} f JOIN {post} p ON p.author_id = f.author_id'
+        )
+        return cursor.rowcount
@@ -1,6 +1,6 @@
 from django.urls import path
 
-from . import views
+from . import api, metrics, views
 
 urlpatterns = [
     path('group/<slug:slug>/',
@@ -9,6 +9,33 @@ urlpatterns = [
     path('new/',
          views.new_post,
          name="new_post"),
+    path('api/posts/',
+         api.feed,
+         name='api_feed'),
+    path('api/posts/<int:post_id>/',
+         api.post_detail,
+         name='api_post'),
+    path('api/groups/<slug:slug>/posts/',
+         api.group_feed,
+         name='api_group_feed'),
+    path('api/authors/<str:username>/posts/',
+         api.author_feed,
+         name='api_author_feed'),
+    path('api/follow/posts/',
+         api.follow_feed,
+         name='api_follow_feed'),
+    path('export/authors/<str:username>/',
+         views.export_author,
+         name='export_author'),
+    path('export/groups/<slug:slug>/',
+         views.export_group,
+         name='export_group'),
+    path('metrics/',
+         metrics.export,
+         name='metrics'),
+    path('search/',
+         views.search_results,
+         name='search'),
     path('<str:username>/<int:post_id>/',
          views.post_view,
          name='post'),
@@ -18,6 +45,9 @@ urlpatterns = [
     path('<username>/<int:post_id>/comment/',
          views.add_comment,
          name="add_comment"),
+    path('<str:username>/<int:post_id>/comments/',
+         views.post_comments,
+         name='post_comments'),
     path('follow/',
          views.follow_index,
          name='follow_index'),
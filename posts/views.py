@@ -1,9 +1,62 @@
 from django.contrib.auth.decorators import login_required
+from django.core.exceptions import PermissionDenied
 from django.core.paginator import Paginator
+from django.db import transaction
+from django.http import (HttpResponseBadRequest, JsonResponse,
+                         StreamingHttpResponse)
 from django.shortcuts import redirect, render, get_object_or_404
+from django.views.decorators.http import condition
 
+from . import exporter, feed_cache, search, timeline
 from .forms import CommentForm, PostForm
-from .models import Post, Group, User, Follow
+from .models import Comment, Post, Group, User, Follow
+from .pagination import CursorPaginator, first_page
+from .replicas import replica_reads
+from .stats import get_stats
+
+COMMENTS_PER_PAGE = 20
+SEARCH_RESULTS_PER_PAGE = 10
+
+
+def feed_condition(scopes):
+    """Отвечает 304, пока не изменились ленты ``scopes(**kwargs)``.
+
+    Валидаторы — версии лент из кэша, страница для них не строится.
+    Если ``scopes`` вернула None (объекта нет), запрос идёт в
+    представление как обычно.
+    """
+    def found_scopes(request, kwargs):
+        if not hasattr(request, '_feed_scopes'):
+            request._feed_scopes = scopes(**kwargs)
+        return request._feed_scopes
+
+    def etag(request, *args, **kwargs):
+        found = found_scopes(request, kwargs)
+        return feed_cache.etag(request, *found) if found else None
+
+    def last_modified(request, *args, **kwargs):
+        found = found_scopes(request, kwargs)
+        return feed_cache.last_changed(*found) if found else None
+
+    return condition(etag_func=etag, last_modified_func=last_modified)
+
+
+def _group_scopes(slug):
+    group_id = Group.objects.filter(slug=slug).values_list(
+        'id', flat=True
+    ).first()
+    if group_id is None:
+        return None
+    return [feed_cache.group_scope(group_id)]
+
+
+def _author_scopes(username, post_id=None):
+    author_id = User.objects.filter(username=username).values_list(
+        'id', flat=True
+    ).first()
+    if author_id is None:
+        return None
+    return [feed_cache.author_scope(author_id)]
 
 
 def page_not_found(request, exception):
@@ -19,33 +72,65 @@ def server_error(request):
     return render(request, "misc/500.html", status=500)
 
 
+@replica_reads
+@feed_condition(lambda: [feed_cache.GLOBAL])
 def index(request):
-    post_list = Post.objects.all()
+    post_list = Post.objects.feed()
+    cursors = CursorPaginator(post_list, 10)
+    before = request.GET.get('before')
+    after = request.GET.get('after')
+    if before or after:
+        page = cursors.page(before=before, after=after)
+        return render(request, 'index.html', {
+            'page': page,
+            'pager': page,
+            **feed_cache.context(feed_cache.GLOBAL),
+            **feed_cache.fragment(request.user, page, before=before,
+                                  after=after),
+        })
+    if 'page' not in request.GET:
+        # Первая страница — тоже курсорная, без COUNT(*) по всей таблице
+        paginator, page, pager = first_page(cursors)
+        return render(request, 'index.html', {
+            'page': page,
+            'paginator': paginator,
+            'pager': pager,
+            **feed_cache.context(feed_cache.GLOBAL),
+            **feed_cache.fragment(request.user, page),
+        })
     paginator = Paginator(post_list, 10)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
+    page = paginator.get_page(request.GET.get('page'))
     return render(request, 'index.html', {
         'page': page,
-        'paginator': paginator
+        'paginator': paginator,
+        'pager': page,
+        'next_cursor': cursors.encode(page[-1]) if page.has_next() else None,
+        **feed_cache.context(feed_cache.GLOBAL),
+        **feed_cache.fragment(request.user, page),
     })
 
 
+@replica_reads
+@feed_condition(_group_scopes)
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.all()
+    posts = group.posts.feed()
     paginator = Paginator(posts, 12)
     page_number = request.GET.get('page')
     page = paginator.get_page(page_number)
     return render(request, 'group.html', {
         'group': group,
         "page": page,
-        'paginator': paginator
+        'paginator': paginator,
+        **feed_cache.context(feed_cache.group_scope(group.id)),
+        **feed_cache.fragment(request.user, page),
     })
 
 
 @login_required
+@transaction.atomic
 def new_post(request):
-    form = PostForm(request.POST or None)
+    form = PostForm(request.POST or None, files=request.FILES or None)
     if not form.is_valid():
         return render(request, 'new_post.html', {'form': form})
     form.instance.author = request.user
@@ -53,9 +138,14 @@ def new_post(request):
     return redirect('index')
 
 
+@replica_reads
+@feed_condition(_author_scopes)
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    posts = author.posts.all()
+    author = get_object_or_404(
+        User.objects.select_related('stats'),
+        username=username
+    )
+    posts = author.posts.feed()
     paginator = Paginator(posts, 10)
     page_number = request.GET.get('page')
     page = paginator.get_page(page_number)
@@ -65,24 +155,121 @@ def profile(request, username):
     ).exists()
     return render(request, 'profile.html', {
         'author': author,
+        'stats': get_stats(author),
         'page': page,
         'paginator': paginator,
         'following': following,
+        **feed_cache.context(feed_cache.author_scope(author.id)),
+        **feed_cache.fragment(request.user, page, author_ids={author.id}),
     })
 
 
+@replica_reads
+@feed_condition(_author_scopes)
 def post_view(request, username, post_id):
-    post = get_object_or_404(Post, author__username=username, pk=post_id)
-    comments = post.comments.all()
+    post = get_object_or_404(
+        Post.objects.feed().select_related('author__stats'),
+        author__username=username,
+        pk=post_id
+    )
+    comments = CursorPaginator(
+        post.comments.select_related('author'),
+        COMMENTS_PER_PAGE,
+        field='created'
+    ).page(before=request.GET.get('before'), after=request.GET.get('after'))
     form = CommentForm()
     return render(request, 'post.html', {
         'author': post.author,
+        'stats': get_stats(post.author),
         'post': post,
-        'comments': comments,
+        'comments': comments.object_list,
+        'comments_page': comments,
         'form': form,
     })
 
 
+def post_comments(request, username, post_id):
+    post = get_object_or_404(
+        Post.objects.only('id'),
+        author__username=username,
+        pk=post_id
+    )
+    page = CursorPaginator(
+        Comment.objects.filter(post=post).select_related('author').only(
+            'id', 'text', 'created', 'author', 'author__username'
+        ),
+        COMMENTS_PER_PAGE,
+        field='created'
+    ).page(before=request.GET.get('before'), after=request.GET.get('after'))
+    return JsonResponse({
+        'comments': [{
+            'id': comment.id,
+            'author': comment.author.username,
+            'text': comment.text,
+            'created': comment.created.isoformat(),
+        } for comment in page],
+        'next': page.next_cursor,
+        'previous': page.previous_cursor,
+    })
+
+
+def search_results(request):
+    query = request.GET.get('q', '').strip()
+    scope = request.GET.get('scope')
+    if scope not in search.SOURCES:
+        scope = 'posts'
+    hits, next_cursor = search.find(
+        query, scope,
+        after=request.GET.get('after'),
+        limit=SEARCH_RESULTS_PER_PAGE
+    )
+    if scope == 'posts':
+        found = Post.objects.feed()
+    else:
+        found = Comment.objects.select_related('author', 'post__author')
+    found = found.in_bulk([pk for pk, _ in hits])
+    return render(request, 'search.html', {
+        'query': query,
+        'scope': scope,
+        'results': [(found[pk], snippet) for pk, snippet in hits
+                    if pk in found],
+        'next_cursor': next_cursor,
+    })
+
+
+def _export(request, scope, name):
+    """Выгрузка записей ``scope`` потоком: JSONL или ZIP (``?format=zip``).
+
+    Комментарии — обсуждения выгружаемых записей, кто бы их ни написал.
+    """
+    fmt = request.GET.get('format', 'jsonl')
+    if fmt not in exporter.FORMATS:
+        return HttpResponseBadRequest('Неизвестный формат')
+    chunks, content_type, extension = exporter.FORMATS[fmt]
+    response = StreamingHttpResponse(chunks(scope), content_type=content_type)
+    response['Content-Disposition'] = (
+        f'attachment; filename="{name}.{extension}"'
+    )
+    return response
+
+
+@login_required
+def export_author(request, username):
+    author = get_object_or_404(User, username=username)
+    if request.user != author and not request.user.is_staff:
+        raise PermissionDenied
+    return _export(request, {'author': author}, author.username)
+
+
+@login_required
+def export_group(request, slug):
+    # Выгрузка чужих записей целиком — только для персонала
+    if not request.user.is_staff:
+        raise PermissionDenied
+    group = get_object_or_404(Group, slug=slug)
+    return _export(request, {'group': group}, group.slug)
+
+
 @login_required
 def post_edit(request, username, post_id):
     if request.user.username != username:
@@ -100,6 +287,7 @@ def post_edit(request, username, post_id):
 
 
 @login_required
+@transaction.atomic
 def add_comment(request, username, post_id):
     form = CommentForm(request.POST or None)
     if not form.is_valid():
@@ -112,29 +300,45 @@ def add_comment(request, username, post_id):
 
 
 @login_required
+@replica_reads
 def follow_index(request):
-    posts = Post.objects.filter(author__following__user=request.user)
-    paginator = Paginator(posts, 10)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
-    return render(request, "follow.html", {
-        'page': page,
-        'paginator': paginator
+    cursors = timeline.cursors(Post.objects.feed(), request.user, 10)
+    before = request.GET.get('before')
+    after = request.GET.get('after')
+    if before or after:
+        page = cursors.page(before=before, after=after)
+        return render(request, 'follow.html', {
+            'page': page,
+            'pager': page,
         })
+    if 'page' not in request.GET:
+        paginator, page, pager = first_page(cursors)
+        return render(request, 'follow.html', {
+            'page': page,
+            'paginator': paginator,
+            'pager': pager,
+        })
+    paginator = Paginator(cursors.older_than(), 10)
+    page = paginator.get_page(request.GET.get('page'))
+    return render(request, 'follow.html', {
+        'page': page,
+        'paginator': paginator,
+        'pager': page,
+        'next_cursor': cursors.encode(page[-1]) if page.has_next() else None,
+    })
 
 
 @login_required
+@transaction.atomic
 def profile_follow(request, username):
     author = get_object_or_404(User, username=username)
-    if author != request.user and not Follow.objects.filter(
-        user=request.user,
-        author=author
-    ).exists():
+    if author != request.user:
         Follow.objects.get_or_create(user=request.user, author=author)
     return redirect("profile", username=username)
 
 
 @login_required
+@transaction.atomic
 def profile_unfollow(request, username):
     get_object_or_404(Follow, user=request.user,
                       author__username=username).delete()
@@ -0,0 +1,53 @@
+"""Кодирование WebP-вариантов картинок в отдельных процессах.
+
+Модуль не импортирует Django: функции кодирования выполняются в пуле
+процессов и получают на вход только байты.
+"""
+import io
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from PIL import Image, ImageOps
+
+CARD = 'card'
+FULL = 'full'
+CARD_SIZE = (960, 339)
+
+_pool = None
+
+
+def variant_name(name, variant):
+    """``posts/a.jpg`` → ``posts/webp/a.jpg-card.webp``.
+
+    Расширение исходника остаётся в имени: у ``a.jpg`` и ``a.png``
+    разные варианты.
+    """
+    head, tail = os.path.split(name)
+    return os.path.join(head, 'webp', f'{tail}-{variant}.webp')
+
+
+def encode(data, quality):
+    """Возвращает WebP для карточки и в полном размере."""
+    with Image.open(io.BytesIO(data)) as image:
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if 'transparency' in image.info
+                                  else 'RGB')
+        card = ImageOps.fit(image, CARD_SIZE, Image.LANCZOS)
+        variants = {}
+        for variant, picture in ((CARD, card), (FULL, image)):
+            buffer = io.BytesIO()
+            picture.save(buffer, 'WEBP', quality=quality, method=4)
+            variants[variant] = buffer.getvalue()
+        return variants
+
+
+def pool(processes):
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(
+            max_workers=processes,
+            mp_context=multiprocessing.get_context('spawn'),
+        )
+    return _pool
@@ -1,4 +1,15 @@
+import pytest
+
 pytest_plugins = [
     'tests.fixtures.fixture_user',
     'tests.fixtures.fixture_data',
+    'tests.fixtures.fixture_queries',
 ]
+
+
+@pytest.fixture(autouse=True)
+def wait_for_thumbnails():
+    """Фоновые миниатюры не должны пересекаться с очисткой базы."""
+    yield
+    from posts import thumbnails
+    thumbnails.wait()
@@ -0,0 +1,131 @@
+"""Бюджеты SQL-запросов и времени для представлений.
+
+    @budget(queries=3)
+    def test_index(client, query_budget):
+        with query_budget():
+            client.get('/')
+
+Бюджет берётся из метки ``budget`` или передаётся в ``query_budget()``.
+Кэш перед замером сбрасывается, иначе готовые карточки скроют N+1.
+При превышении в отчёте повторяющиеся запросы сгруппированы по строке
+шаблона (или файла проекта), откуда они были выполнены.
+"""
+import os
+import sys
+import time
+from collections import defaultdict
+from contextlib import ExitStack, contextmanager
+
+import pytest
+
+MARKER = 'query_budget'
+
+
+def budget(queries, seconds=None):
+    """Декоратор теста: не больше ``queries`` запросов и ``seconds`` на них."""
+    return getattr(pytest.mark, MARKER)(queries=queries, seconds=seconds)
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        'markers', f'{MARKER}(queries, seconds): бюджет SQL-запросов теста'
+    )
+
+
+def _origin():
+    """Строка шаблона, а если запрос не из шаблона — строка кода проекта."""
+    from django.conf import settings
+    from django.template.base import Node
+    project = None
+    frame = sys._getframe(2)
+    while frame is not None:
+        node = frame.f_locals.get('self')
+        # type(), а не isinstance: ленивый объект (request.user) иначе
+        # выполнил бы запрос прямо здесь.
+        if issubclass(type(node), Node) and getattr(node, 'token', None):
+            name = node.origin.template_name or node.origin.name
+            return f'{name}:{node.token.lineno}'
+        filename = frame.f_code.co_filename
+        if (project is None and filename.startswith(settings.BASE_DIR)
+                and 'site-packages' not in filename
+                and filename != __file__):
+            project = (f'{os.path.relpath(filename, settings.BASE_DIR)}:'
+                       f'{frame.f_lineno}')
+        frame = frame.f_back
+    return project or '?'
+
+
+class QueryLog:
+    """``execute_wrapper``: запоминает SQL, место вызова и длительность."""
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        origin = _origin()
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append(
+                (sql, origin, time.perf_counter() - started)
+            )
+
+    @property
+    def seconds(self):
+        return sum(duration for _, _, duration in self.queries)
+
+    def duplicates(self):
+        """``[(число, место, sql)]`` для шаблонов SQL, выполненных дважды+."""
+        found = defaultdict(list)
+        for sql, origin, _ in self.queries:
+            found[sql, origin].append(sql)
+        return sorted(
+            ((len(runs), origin, sql)
+             for (sql, origin), runs in found.items() if len(runs) > 1),
+            reverse=True
+        )
+
+    def describe(self):
+        lines = []
+        for count, origin, sql in self.duplicates():
+            lines.append(f'  {count}× {origin}')
+            lines.append(f'      {sql}')
+        if not lines:
+            lines = [f'  {origin}: {sql}' for sql, origin, _ in self.queries]
+            return 'Все запросы:\n' + '\n'.join(lines)
+        return 'Повторяющиеся запросы:\n' + '\n'.join(lines)
+
+
+@pytest.fixture
+def query_budget(request):
+    marker = request.node.get_closest_marker(MARKER)
+    defaults = marker.kwargs if marker else {}
+
+    @contextmanager
+    def check(queries=None, seconds=None, cold=True):
+        from django.core.cache import cache
+        from django.db import connections
+        queries = defaults.get('queries') if queries is None else queries
+        seconds = defaults.get('seconds') if seconds is None else seconds
+        if cold:
+            cache.clear()
+        log = QueryLog()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(log))
+            yield log
+        problems = []
+        if queries is not None and len(log.queries) > queries:
+            problems.append(
+                f'Запросов {len(log.queries)} при бюджете {queries}'
+            )
+        if seconds is not None and log.seconds > seconds:
+            problems.append(
+                f'Запросы заняли {log.seconds:.3f} с при бюджете {seconds} с'
+            )
+        if problems:
+            pytest.fail('\n'.join(problems + [log.describe()]),
+                        pytrace=False)
+
+    return check
@@ -0,0 +1,77 @@
+import pytest
+from django.template import Context, Template
+from django.urls import reverse
+
+from tests.fixtures.fixture_queries import budget
+
+ROWS = (1, 15)
+# Число запросов не должно зависеть от числа записей и комментариев
+VIEWS = [
+    pytest.param('index', marks=budget(queries=4, seconds=0.5)),
+    pytest.param('group_posts', marks=budget(queries=6, seconds=0.5)),
+    pytest.param('profile', marks=budget(queries=7, seconds=0.5)),
+    pytest.param('post_view', marks=budget(queries=5, seconds=0.5)),
+    pytest.param('follow_index', marks=budget(queries=4, seconds=0.5)),
+]
+
+
+@pytest.fixture
+def content(user, group, django_user_model):
+    """Создаёт ``rows`` записей автора и ``rows`` комментариев к первой.
+
+    ``user`` подписан на автора; у каждого комментария свой автор, и он
+    тоже подписчик — так N+1 по пользователям и счётчикам будет виден.
+    """
+    from posts.models import Comment, Follow, Post
+
+    def create(rows):
+        author = django_user_model.objects.create(username='author')
+        Follow.objects.create(user=user, author=author)
+        posts = [
+            Post.objects.create(text=f'Запись {index}', author=author,
+                                group=group)
+            for index in range(rows)
+        ]
+        for index in range(rows):
+            commenter = django_user_model.objects.create(
+                username=f'commenter{index}'
+            )
+            Follow.objects.create(user=commenter, author=author)
+            Comment.objects.create(post=posts[0], author=commenter,
+                                   text=f'Комментарий {index}')
+        return {
+            'index': reverse('index'),
+            'group_posts': reverse('group_posts', args=[group.slug]),
+            'profile': reverse('profile', args=[author.username]),
+            'post_view': reverse('post', args=[author.username, posts[0].id]),
+            'follow_index': reverse('follow_index'),
+        }
+
+    return create
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('rows', ROWS)
+@pytest.mark.parametrize('view', VIEWS)
+def test_view_query_budget(view, rows, content, user_client, query_budget):
+    url = content(rows)[view]
+    with query_budget():
+        response = user_client.get(url)
+    assert response.status_code == 200
+
+
+@pytest.mark.django_db
+def test_query_budget_reports_duplicates_by_template_line(post, user,
+                                                          query_budget):
+    from posts.models import Post
+    Post.objects.create(text='Ещё одна', author=user)
+    template = Template(
+        '{% for post in posts %}\n{{ post.author.username }}\n{% endfor %}'
+    )
+    with pytest.raises(pytest.fail.Exception) as failure:
+        with query_budget(queries=1):
+            template.render(Context({'posts': Post.objects.all()}))
+    message = str(failure.value)
+    assert 'Запросов 3 при бюджете 1' in message
+    assert '2× <unknown source>:2' in message
+    assert 'FROM "auth_user"' in message
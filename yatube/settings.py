@@ -47,23 +47,28 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
     'sorl.thumbnail',
-    'debug_toolbar',
 ]
 
 # Идентификатор текущего сайта
 SITE_ID = 1
 
 MIDDLEWARE = [
+    'posts.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'posts.replicas.PinPrimaryMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    'debug_toolbar.middleware.DebugToolbarMiddleware',
 ]
 
+# Панель отладки замедляет каждый ответ и нужна только при разработке
+if DEBUG:
+    INSTALLED_APPS += ['debug_toolbar']
+    MIDDLEWARE += ['debug_toolbar.middleware.DebugToolbarMiddleware']
+
 ROOT_URLCONF = 'yatube.urls'
 
 TEMPLATES_DIR = os.path.join(BASE_DIR, "templates")
@@ -95,7 +100,38 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
-    }
+        # Соединение переживает запрос, и прагмы не применяются заново
+        'CONN_MAX_AGE': 60,
+    },
+    # Реплика только для чтения: файл обновляет команда sync_replicas
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.path.join(BASE_DIR, 'db.replica.sqlite3'),
+        'CONN_MAX_AGE': 60,
+        'TEST': {'MIRROR': 'default'},
+    },
+}
+
+DATABASE_ROUTERS = ['posts.replicas.ReplicaRouter']
+
+# Реплики, с которых читают ленты и профили (posts/replicas.py); пока
+# список пуст, всё читается с основной базы
+REPLICA_DATABASES = [
+    alias for alias in os.environ.get('YATUBE_READ_REPLICAS', '').split(',')
+    if alias
+]
+# Сколько секунд после изменения браузер читает с основной базы
+REPLICA_PIN_SECONDS = 5
+
+# Прагмы каждого нового соединения SQLite (posts/sqlite.py): WAL не
+# блокирует читателей записью, а писатели ждут блокировку, а не падают
+SQLITE_PRAGMAS = {
+    'journal_mode': 'wal',
+    'synchronous': 'normal',
+    'busy_timeout': 5000,
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,
+    'temp_store': 'memory',
 }
 
 
@@ -150,12 +186,45 @@ EMAIL_BACKEND = "django.core.mail.backends.filebased.EmailBackend"
 # указываем директорию, в которую будут складываться файлы писем
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, "sent_emails")
 
+# Кэш в памяти процесса перед общим для всех процессов файлом SQLite
+# (posts/caching.py): фрагменты не дублируются по процессам, а изменения
+# доходят до соседей не позже чем через POLL_INTERVAL секунд
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': 'posts.caching.TwoTierCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache', 'shared.sqlite3'),
+        'OPTIONS': {
+            'MAX_ENTRIES': 100000,
+            'LOCAL_MAX_ENTRIES': 5000,
+            'LOCAL_MAX_BYTES': 32 * 1024 * 1024,
+            'LOCAL_TIMEOUT': 60,
+            'POLL_INTERVAL': 1,
+        },
     }
 }
 
 INTERNAL_IPS = [
     '127.0.0.1',
 ]
+
+# Откуда можно забирать метрики Prometheus со страницы /metrics/, если
+# METRICS_TOKEN не задан. Проверяется REMOTE_ADDR: за обратным прокси на
+# той же машине он у всех запросов 127.0.0.1, и тогда нужен токен.
+METRICS_ALLOWED_IPS = [
+    '127.0.0.1',
+    '::1',
+]
+# Если задан, /metrics/ отдаётся с любого адреса, но только с заголовком
+# «Authorization: Bearer <токен>» (bearer_token в scrape_config Prometheus)
+METRICS_TOKEN = os.environ.get('YATUBE_METRICS_TOKEN', '')
+
+# Сколько живут фрагменты лент: их ключи версионируются сигналами,
+# поэтому время жизни ограничивает лишь объём кэша
+FEED_CACHE_TIMEOUT = 60 * 60 * 12
+
+# Потоки фоновой генерации миниатюр
+THUMBNAIL_WORKERS = 2
+
+# Процессы и качество кодирования WebP-вариантов картинок
+WEBP_PROCESSES = 2
+WEBP_QUALITY = 80
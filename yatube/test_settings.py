@@ -0,0 +1,25 @@
+"""Настройки для тестов: свой кэш и медиафайлы во временном каталоге.
+
+Тесты очищают кэш и загружают картинки, поэтому общий файл кэша и
+каталог media разработчика или сервера им не подходят; у каждого
+запуска (и каждого параллельного процесса) свой каталог, он удаляется
+при выходе.
+"""
+import atexit
+import shutil
+import tempfile
+
+from .settings import *  # noqa: F401,F403
+from .settings import CACHES
+
+TEST_DIR = tempfile.mkdtemp(prefix='yatube-tests-')
+atexit.register(shutil.rmtree, TEST_DIR, ignore_errors=True)
+
+CACHES = {
+    'default': {
+        **CACHES['default'],
+        'LOCATION': os.path.join(TEST_DIR, 'cache.sqlite3'),  # noqa: F405
+    }
+}
+
+MEDIA_ROOT = os.path.join(TEST_DIR, 'media')  # noqa: F405